@@ -2,16 +2,73 @@ import requests
 import json
 import argparse
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from ingestdata import ingest_data
 from analysis_db import AnalysisDB
 from db_manager import ArchiveDB
 from key_rotator import rotator
+from llm_stream import DiscoveryStreamParser, iter_sse_content
+from metrics import REGISTRY
 
-def analyze_data(input_data, api_key, source_boards=None):
+MODEL = "xiaomi/mimo-v2-flash:free"
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram("rootsearch_llm_request_seconds", "OpenRouter completion latency, until the full response is read.", ("model", "mode"))
+LLM_TOKENS = REGISTRY.counter("rootsearch_llm_tokens_total", "Tokens reported by OpenRouter usage.", ("model", "type"))
+LLM_FAILURES = REGISTRY.counter("rootsearch_llm_failures_total", "Failed or unusable completions by reason.", ("model", "reason"))
+
+def save_backup(json_analysis, source_boards):
+    """Writes the parsed analysis to data/analysis_<boards>.json for debugging."""
+    source_name = "_".join(source_boards) if isinstance(source_boards, list) else (source_boards or "output")
+    project_root = Path(__file__).resolve().parent.parent
+    output_file = project_root / "data" / f"analysis_{source_name}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(json_analysis, f, indent=2)
+
+def record_usage(usage):
+    """Adds a completion's reported token usage to the LLM token counters."""
+    LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, model=MODEL, type="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens") or 0, model=MODEL, type="completion")
+
+def consume_stream(response, db, source_boards):
+    """
+    Reads a streamed completion and persists each discovery as soon as its JSON
+    object is complete. Returns the number of discoveries saved.
+    """
+    parser = DiscoveryStreamParser()
+    discoveries = []
+    usage = {}
+    started = time.monotonic()
+
+    try:
+        for chunk in iter_sse_content(response, usage):
+            completed = parser.feed(chunk)
+            if completed:
+                if not discoveries:
+                    print(f"[*] First discovery received after {time.monotonic() - started:.1f}s")
+                db.save_analysis(source_boards or "unknown", {"opportunities": completed})
+                discoveries.extend(completed)
+    except Exception as e:
+        print(f"[!] Stream interrupted: {e}")
+    record_usage(usage)
+
+    if not parser.finished or parser.skipped:
+        LLM_FAILURES.inc(model=MODEL, reason="incomplete_stream")
+        print(f"[!] Incomplete stream: kept {len(discoveries)} discoveries, skipped {parser.skipped}. Saving raw output to analysis_failed.txt")
+        with open("analysis_failed.txt", "w", encoding="utf-8") as f:
+            f.write(parser.buffer)
+
+    print(f"[*] Analysis complete! Saved {len(discoveries)} discoveries to data/opportunities.db")
+    save_backup({"discoveries": discoveries}, source_boards)
+    return len(discoveries)
+
+def analyze_data(input_data, api_key, source_boards=None, stream=False):
     """
     Analyzes list of thread data and sends it to the AI for product analysis.
+    With stream=True the completion is consumed as it arrives and discoveries are
+    saved one by one, so a truncated response still keeps everything before the cut.
     """
     if not api_key or api_key == "<OPENROUTER_API_KEY>":
         print("[!] Error: Please provide a valid OpenRouter API key.")
@@ -129,6 +186,7 @@ def analyze_data(input_data, api_key, source_boards=None):
 
     user_content = json.dumps(input_data, indent=2)
 
+    started = time.perf_counter()
     try:
         response = requests.post(
             url="https://openrouter.ai/api/v1/chat/completions",
@@ -137,15 +195,31 @@ def analyze_data(input_data, api_key, source_boards=None):
                 "Content-Type": "application/json",
             },
             data=json.dumps({
-                "model": "xiaomi/mimo-v2-flash:free",
+                "model": MODEL,
                 "messages": [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_content}
-                ]
-            })
+                ],
+                "stream": stream,
+                # Streams only report token usage in a final chunk when asked
+                **({"stream_options": {"include_usage": True}} if stream else {})
+            }),
+            stream=stream
         )
+        # Every request that reached OpenRouter counts against the key's quota
+        rotator.increment_count(api_key)
+        if response.status_code == 429:
+            rotator.report_rate_limited(api_key, response.headers.get("Retry-After"))
         response.raise_for_status()
+
+        if stream:
+            consume_stream(response, db, source_boards)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=MODEL, mode="stream")
+            return
+
         result = response.json()
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=MODEL, mode="batch")
+        record_usage(result.get("usage") or {})
         
         analysis_content = result['choices'][0]['message']['content']
         
@@ -166,24 +240,19 @@ def analyze_data(input_data, api_key, source_boards=None):
             # Save to Database
             count = db.save_analysis(source_boards or "unknown", normalized_analysis)
             print(f"[*] Analysis complete! Saved {count} discoveries to data/opportunities.db")
-            
-            # Increment API request count for rotation
-            rotator.increment_count()
-            
+
             # Optional: Also save to JSON for backup/debugging
-            source_name = "_".join(source_boards) if isinstance(source_boards, list) else (source_boards or "output")
-            project_root = Path(__file__).resolve().parent.parent
-            output_file = project_root / "data" / f"analysis_{source_name}.json"
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(json_analysis, f, indent=2)
-            
+            save_backup(json_analysis, source_boards)
+
         except json.JSONDecodeError:
+            LLM_FAILURES.inc(model=MODEL, reason="invalid_json")
             print("[!] AI did not return valid JSON. Saving raw output to analysis_failed.txt")
             with open("analysis_failed.txt", "w", encoding="utf-8") as f:
                 f.write(analysis_content)
 
     except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        LLM_FAILURES.inc(model=MODEL, reason=f"http_{status}" if status else type(e).__name__)
         print(f"[!] API Error: {e}")
 
 if __name__ == "__main__":
@@ -194,6 +263,8 @@ if __name__ == "__main__":
     parser.add_argument("--limit", type=int, default=15, help="Limit per board (default: 20)")
     parser.add_argument("--min-replies", type=int, default=30, help="Min replies per thread (default: 30)")
     parser.add_argument("--api-key", help="OpenRouter API Key")
+    parser.add_argument("--stream", action="store_true", help="Stream the completion and save discoveries as they arrive")
+    parser.add_argument("--prescore", action="store_true", help="Only analyze the threads with the highest local signal score")
     
     args = parser.parse_args()
     
@@ -221,20 +292,22 @@ if __name__ == "__main__":
         print(f"[*] Starting analysis for {len(boards_to_process)} boards...")
         for board in boards_to_process:
             print(f"\n--- Analyzing /{board}/ ---")
-            data = ingest_data([board], limit=args.limit, min_replies=args.min_replies)
+            data = ingest_data([board], limit=args.limit, min_replies=args.min_replies, prescore=args.prescore)
             if not data:
                 print(f"[*] skipping /{board}/ (no data matches criteria)")
                 continue
             
             # Refresh key mid-run if using rotator
             current_key = args.api_key or rotator.get_active_key() or os.getenv("OPENROUTER_API_KEY") or "<OPENROUTER_API_KEY>"
-            analyze_data(data, current_key, source_boards=[board])
+            analyze_data(data, current_key, source_boards=[board], stream=args.stream)
+        rotator.flush()
     elif args.file:
         input_path = Path(args.file)
         if input_path.exists():
             with open(input_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            analyze_data(data, api_key, source_boards=input_path.stem)
+            analyze_data(data, api_key, source_boards=input_path.stem, stream=args.stream)
+            rotator.flush()
         else:
             print(f"[!] File not found: {args.file}")
     else:
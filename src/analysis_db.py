@@ -3,6 +3,39 @@ import json
 import logging
 import time
 from pathlib import Path
+from metrics import timed_query
+import query_log
+import migrations
+from simhash import simhash, hamming, bands, opportunity_text, SIGNATURE_FIELDS, MAX_DISTANCE
+
+# Board activity time series: bucket widths in seconds, and default retention
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+SAMPLE_RETENTION = 2 * 86400
+HOURLY_RETENTION = 35 * 86400
+
+# Folds one sample into a (board, resolution, bucket) rollup; params follow the column list
+ROLLUP_UPSERT = '''
+    INSERT INTO board_rollups (board_code, resolution, bucket, samples, threads_sum, replies_sum,
+                               replies_max, threads_last, replies_last, images_last, last_ts)
+    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(board_code, resolution, bucket) DO UPDATE SET
+        samples = samples + 1,
+        threads_sum = threads_sum + excluded.threads_sum,
+        replies_sum = replies_sum + excluded.replies_sum,
+        replies_max = MAX(replies_max, excluded.replies_max),
+        threads_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.threads_last ELSE threads_last END,
+        replies_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.replies_last ELSE replies_last END,
+        images_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.images_last ELSE images_last END,
+        last_ts = MAX(last_ts, excluded.last_ts)
+'''
+
+def _merge_boards(existing, new):
+    """Union of two comma separated board lists, keeping the existing order."""
+    merged = [b for b in existing.split(",") if b]
+    for b in new.split(","):
+        if b and b not in merged:
+            merged.append(b)
+    return ",".join(merged)
 
 class AnalysisDB:
     def __init__(self, db_path="data/opportunities.db"):
@@ -10,261 +43,143 @@ class AnalysisDB:
         project_root = Path(__file__).parent.parent
         self.db_path = project_root / db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), timeout=20)
+        self.conn = query_log.connect(str(self.db_path), timeout=20)
         # Enable WAL (Write-Ahead Logging) for concurrent read/writes
         self.conn.execute("PRAGMA journal_mode=WAL")
-        self._create_tables()
-        self._migrate_schema()
-
-    def _migrate_schema(self):
-        """Adds missing columns and indexes to existing tables."""
+        migrations.migrate(self.conn, "analysis", migrations.ANALYSIS_MIGRATIONS)
+
+    def _find_near_duplicate(self, cursor, sig, intent_category):
+        """Returns (id, source_boards) of the closest stored opportunity within MAX_DISTANCE bits, or None."""
+        sig_bands = bands(sig)
+        band_sql = " OR ".join(["(b.band = ? AND b.value = ?)"] * len(sig_bands))
+        params = [v for pair in sig_bands for v in pair] + [intent_category]
+        candidates = cursor.execute(f'''
+            SELECT DISTINCT s.opportunity_id, s.simhash
+            FROM opportunity_sig_bands b
+            JOIN opportunity_signatures s ON s.opportunity_id = b.opportunity_id
+            WHERE ({band_sql}) AND s.intent_category IS ?
+        ''', params).fetchall()
+
+        best = None
+        for opp_id, other in candidates:
+            distance = hamming(sig, other)
+            if distance <= MAX_DISTANCE and (best is None or distance < best[1]):
+                best = (opp_id, distance)
+        if best is None:
+            return None
+        return cursor.execute("SELECT id, source_boards FROM opportunities WHERE id = ?", (best[0],)).fetchone()
+
+    def record_board_sample(self, board, threads, replies, images=None, ts=None,
+                            sample_retention=SAMPLE_RETENTION, hourly_retention=HOURLY_RETENTION):
+        """
+        Stores one raw activity sample (normally one per scrape cycle) and folds it into the
+        board's hourly and daily rollups, then drops raw samples and hourly buckets past
+        their retention (0 = keep). Returns False if a sample with this timestamp exists.
+        """
         cursor = self.conn.cursor()
-        
-        # 1. New Columns for 'opportunities'
-        new_cols = [
-            ("market_score", "INTEGER"),
-            ("complexity", "TEXT"),
-            ("market_size", "TEXT"),
-            ("product_domain", "TEXT"),
-            ("intent_category", "TEXT"),
-            ("flair_type", "TEXT"),
-            ("core_pain", "TEXT")
-        ]
-        
-        # Check existing columns
-        cursor.execute("PRAGMA table_info(opportunities)")
-        existing_cols = [row[1] for row in cursor.fetchall()]
-        
-        for col_name, col_type in new_cols:
-            if col_name not in existing_cols:
-                try:
-                    cursor.execute(f"ALTER TABLE opportunities ADD COLUMN {col_name} {col_type}")
-                    print(f"[*] Migrated schema: Added {col_name} to opportunities")
-                except Exception as e:
-                    print(f"[!] Migration error for {col_name}: {e}")
-                    
-        # 2. Indexes for Performance
-        indexes = [
-            ("idx_market_score", "opportunities", "market_score"),
-            ("idx_intent", "opportunities", "intent_category"),
-            ("idx_timestamp", "opportunities", "timestamp")
-        ]
-        
-        for idx_name, table, col in indexes:
-            try:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS {idx_name} ON {table}({col})")
-            except Exception as e:
-                print(f"[!] Index creation error {idx_name}: {e}")
-
-        # 3. FTS5 Virtual Table for Instant Search
-        try:
-            # Check if FTS table exists and has all columns
-            cursor.execute("PRAGMA table_info(opportunities_fts)")
-            existing_fts_cols = [row[1] for row in cursor.fetchall()]
-            required_fts_cols = ["core_pain", "product_concept", "solution", "emerging_trend", "category", "intent_category", "product_domain", "target_audience", "source_boards"]
-            
-            needs_recreate = False
-            if not existing_fts_cols:
-                needs_recreate = True
-            else:
-                for col in required_fts_cols:
-                    if col not in existing_fts_cols:
-                        needs_recreate = True
-                        break
-            
-            if needs_recreate:
-                print("[*] Rebuilding FTS5 Search Index...")
-                # Drop old if exists
-                cursor.execute("DROP TABLE IF EXISTS opportunities_fts")
-                cursor.execute("DROP TRIGGER IF EXISTS opportunities_ai")
-                cursor.execute("DROP TRIGGER IF EXISTS opportunities_ad")
-                cursor.execute("DROP TRIGGER IF EXISTS opportunities_au")
-                
-                # Create FTS table
-                cols_sql = ", ".join(required_fts_cols)
-                cursor.execute(f'''
-                    CREATE VIRTUAL TABLE opportunities_fts USING fts5(
-                        {cols_sql},
-                        content='opportunities', 
-                        content_rowid='id'
-                    )
-                ''')
-                
-                # Create Triggers to keep FTS in sync with main table
-                cursor.execute(f'''
-                    CREATE TRIGGER opportunities_ai AFTER INSERT ON opportunities BEGIN
-                      INSERT INTO opportunities_fts(rowid, {cols_sql}) 
-                      VALUES (new.id, new.core_pain, new.product_concept, new.solution, new.emerging_trend, new.category, new.intent_category, new.product_domain, new.target_audience, new.source_boards);
-                    END;
-                ''')
-                cursor.execute(f'''
-                    CREATE TRIGGER opportunities_ad AFTER DELETE ON opportunities BEGIN
-                      INSERT INTO opportunities_fts(opportunities_fts, rowid, {cols_sql}) 
-                      VALUES('delete', old.id, old.core_pain, old.product_concept, old.solution, old.emerging_trend, old.category, old.intent_category, old.product_domain, old.target_audience, old.source_boards);
-                    END;
-                ''')
-                cursor.execute(f'''
-                    CREATE TRIGGER opportunities_au AFTER UPDATE ON opportunities BEGIN
-                      INSERT INTO opportunities_fts(opportunities_fts, rowid, {cols_sql}) 
-                      VALUES('delete', old.id, old.core_pain, old.product_concept, old.solution, old.emerging_trend, old.category, old.intent_category, old.product_domain, old.target_audience, old.source_boards);
-                      INSERT INTO opportunities_fts(rowid, {cols_sql}) 
-                      VALUES (new.id, new.core_pain, new.product_concept, new.solution, new.emerging_trend, new.category, new.intent_category, new.product_domain, new.target_audience, new.source_boards);
-                    END;
-                ''')
-                
-                # Backfill existing data
-                print("[*] Backfilling FTS Index...")
-                cursor.execute(f'''
-                    INSERT INTO opportunities_fts(rowid, {cols_sql})
-                    SELECT id, {cols_sql} FROM opportunities
-                ''')
-        except Exception as e:
-            print(f"[!] FTS5 Error: {e}")
-
-        # Migrations for Tracked Keywords
-        cursor.execute("PRAGMA table_info(tracked_keywords)")
-        tk_cols = [row[1] for row in cursor.fetchall()]
-        if "label" not in tk_cols:
-            cursor.execute("ALTER TABLE tracked_keywords ADD COLUMN label TEXT")
-            
-        cursor.execute("PRAGMA table_info(keyword_matches)")
-        km_cols = [row[1] for row in cursor.fetchall()]
-        if "is_read" not in km_cols:
-            cursor.execute("ALTER TABLE keyword_matches ADD COLUMN is_read INTEGER DEFAULT 0")
-
+        ts = int(ts or time.time())
+        cursor.execute(
+            "INSERT OR IGNORE INTO board_samples (board_code, ts, threads, replies, images) VALUES (?, ?, ?, ?, ?)",
+            (board, ts, threads, replies, images))
+        if cursor.rowcount != 1:
+            self.conn.commit()
+            return False
+        cursor.executemany(ROLLUP_UPSERT, [
+            (board, seconds, ts - ts % seconds, threads, replies, replies, threads, replies, images, ts)
+            for seconds in RESOLUTIONS.values()
+        ])
+        if sample_retention:
+            cursor.execute("DELETE FROM board_samples WHERE board_code = ? AND ts < ?", (board, ts - sample_retention))
+        if hourly_retention:
+            cursor.execute("DELETE FROM board_rollups WHERE board_code = ? AND resolution = ? AND bucket < ?",
+                           (board, RESOLUTIONS["hour"], ts - hourly_retention))
         self.conn.commit()
+        return True
 
-    def _create_tables(self):
+    def get_board_replies_before(self, board, ts):
+        """Replies at the end of the latest hourly (else daily) bucket that closed by ts, or None."""
         cursor = self.conn.cursor()
-        
-        # Table for the high-level opportunities
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS opportunities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source_boards TEXT,
-                category TEXT,
-                pain_points TEXT, -- JSON array
-                emerging_trend TEXT,
-                solution TEXT,
-                product_concept TEXT,
-                target_audience TEXT,
-                market_score INTEGER,
-                complexity TEXT,
-                market_size TEXT,
-                product_domain TEXT,
-                intent_category TEXT,
-                flair_type TEXT,
-                core_pain TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Table for the evidence linked to posts
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS evidence (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                opportunity_id INTEGER,
-                post_id INTEGER,
-                quote TEXT,
-                relevance TEXT,
-                FOREIGN KEY(opportunity_id) REFERENCES opportunities(id)
-            )
-        ''')
-
-        # 3. Tracked Keywords
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tracked_keywords (
-                user_id TEXT,
-                keyword TEXT,
-                added_at INTEGER,
-                label TEXT,
-                PRIMARY KEY (user_id, keyword)
-            )
-        ''')
-
-        # 4. Keyword Matches
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS keyword_matches (
-                user_id TEXT,
-                post_id INTEGER,
-                keyword TEXT,
-                board TEXT,
-                thread_id INTEGER,
-                comment TEXT,
-                found_at INTEGER,
-                is_read INTEGER DEFAULT 0,
-                PRIMARY KEY (user_id, post_id, keyword)
-            )
-        ''')
-
-        # 5. Board Stats History
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS board_stats_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                board_code TEXT,
-                threads INTEGER,
-                replies INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # 6. Global Settings (for API Rotation, etc.)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        ''')
-
-        # 8. Curated Collections (User Specific)
-        # Drop old global table if it lacks user_id (simplistic migration for this dev phase)
-        try:
-             # Check if user_id exists
-             cursor.execute("SELECT user_id FROM collections LIMIT 1")
-        except:
-             # If error, it means table exists but no user_id (or table doesn't exist). 
-             # For now, let's just drop and recreate to be clean since we just added it.
-             cursor.execute("DROP TABLE IF EXISTS collections")
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS collections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                name TEXT,
-                boards TEXT, -- Comma separated board codes
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, name)
-            )
-        ''')
+        for seconds in (RESOLUTIONS["hour"], RESOLUTIONS["day"]):
+            row = cursor.execute('''
+                SELECT replies_last FROM board_rollups
+                WHERE board_code = ? AND resolution = ? AND bucket <= ?
+                ORDER BY bucket DESC LIMIT 1
+            ''', (board, seconds, ts - seconds)).fetchone()
+            if row:
+                return row[0]
+        return None
 
-        # 7. Board Stats Cache (Replaces local JSON file)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS board_stats_cache (
-                board_code TEXT PRIMARY KEY,
-                data JSON,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    @timed_query("analysis")
+    def get_board_history(self, board, resolution="hour", points=48):
+        """
+        The latest `points` rollup buckets for a board, oldest first, with reply delta,
+        velocity (replies/hour) and growth (%) against the previous bucket computed by
+        window functions. A primary key range scan of points + 1 rows.
+        """
+        seconds = RESOLUTIONS[resolution]
+        cursor = self.conn.cursor()
+        rows = cursor.execute('''
+            SELECT bucket, samples, threads_avg, replies_avg, replies_max, replies_last, images_last,
+                   replies_last - prev_replies,
+                   ROUND((replies_last - prev_replies) * 3600.0 / (bucket - prev_bucket), 2),
+                   ROUND(100.0 * (replies_last - prev_replies) / NULLIF(prev_replies, 0), 2)
+            FROM (
+                SELECT bucket, samples,
+                       ROUND(1.0 * threads_sum / samples, 1) AS threads_avg,
+                       ROUND(1.0 * replies_sum / samples, 1) AS replies_avg,
+                       replies_max, replies_last, images_last,
+                       LAG(replies_last) OVER w AS prev_replies,
+                       LAG(bucket) OVER w AS prev_bucket
+                FROM (
+                    SELECT * FROM board_rollups
+                    WHERE board_code = ? AND resolution = ?
+                    ORDER BY bucket DESC LIMIT ?
+                )
+                WINDOW w AS (ORDER BY bucket)
             )
-        ''')
-        self.conn.commit()
+            ORDER BY bucket
+        ''', (board, seconds, points + 1)).fetchall()
+        # The extra oldest bucket only seeds the first point's delta
+        if len(rows) > points:
+            rows = rows[1:]
+        return [
+            {
+                "t": r[0],
+                "samples": r[1],
+                "threads": r[2],
+                "replies": r[3],
+                "replies_max": r[4],
+                "replies_last": r[5],
+                "images": r[6],
+                "replies_delta": r[7],
+                "velocity": r[8],
+                "growth": r[9]
+            }
+            for r in rows
+        ]
 
-    def save_board_stats(self, board, threads, replies):
-        """Log current stats for a board (History)."""
+    def save_board_cache(self, board, data):
+        """Save full board stats JSON to cache table. updated_at/version only move when the data changed."""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO board_stats_history (board_code, threads, replies)
-            VALUES (?, ?, ?)
-        ''', (board, threads, replies))
+            INSERT INTO board_stats_cache (board_code, data, updated_at, checked_at, version)
+            VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1)
+            ON CONFLICT(board_code) DO UPDATE SET
+                checked_at = excluded.checked_at,
+                updated_at = CASE WHEN data IS excluded.data THEN updated_at ELSE excluded.updated_at END,
+                version = CASE WHEN data IS excluded.data THEN version ELSE COALESCE(version, 0) + 1 END,
+                data = excluded.data
+        ''', (board, json.dumps(data)))
         self.conn.commit()
 
-    def save_board_cache(self, board, data):
-        """Save full board stats JSON to cache table."""
+    def touch_board_cache(self, board):
+        """Marks a board's cached stats as checked (its catalog was unchanged). Returns False if nothing is cached."""
         cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO board_stats_cache (board_code, data, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (board, json.dumps(data)))
+        cursor.execute("UPDATE board_stats_cache SET checked_at = CURRENT_TIMESTAMP WHERE board_code = ?", (board,))
         self.conn.commit()
+        return cursor.rowcount == 1
 
+    @timed_query("analysis")
     def get_all_cached_stats(self):
         """Retrieve all cached board stats as a dictionary."""
         cursor = self.conn.cursor()
@@ -279,6 +194,41 @@ class AnalysisDB:
                 pass
         return results
 
+    @timed_query("analysis")
+    def get_cached_stats(self, board):
+        """Returns (stats, age in seconds) for one board from the cache, or None."""
+        cursor = self.conn.cursor()
+        row = cursor.execute('''
+            SELECT data, CAST((julianday('now') - julianday(COALESCE(checked_at, updated_at))) * 86400 AS INTEGER)
+            FROM board_stats_cache WHERE board_code = ?
+        ''', (board,)).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0]), max(row[1] or 0, 0)
+        except (TypeError, ValueError):
+            return None
+
+    def get_board_cache_version(self):
+        """
+        Returns (latest updated_at as unix time, row count, summed row versions) of the
+        board stats cache. Only changes to the stored stats move these; re-checking an
+        unchanged catalog does not.
+        """
+        cursor = self.conn.cursor()
+        row = cursor.execute("SELECT CAST(strftime('%s', MAX(updated_at)) AS INTEGER), COUNT(*), TOTAL(version) FROM board_stats_cache").fetchone()
+        return row[0], row[1], int(row[2])
+
+    def get_opportunities_version(self):
+        """
+        Returns (latest opportunity id, latest evidence id). Every save appends evidence,
+        including near-duplicate merges that update an existing row, so this changes
+        whenever /opportunities results can change.
+        """
+        cursor = self.conn.cursor()
+        seqs = dict(cursor.execute("SELECT name, seq FROM sqlite_sequence WHERE name IN ('opportunities', 'evidence')").fetchall())
+        return seqs.get("opportunities", 0), seqs.get("evidence", 0)
+
     # --- Collections ---
     def get_collections(self, user_id):
         cursor = self.conn.cursor()
@@ -297,6 +247,7 @@ class AnalysisDB:
         self.conn.commit()
 
     # --- Saved Items ---
+    @timed_query("analysis")
     def get_saved_items(self, user_id):
         cursor = self.conn.cursor()
         cursor.execute("SELECT opportunity_id, data, saved_at FROM saved_items WHERE user_id = ? ORDER BY saved_at DESC", (user_id,))
@@ -336,32 +287,34 @@ class AnalysisDB:
         ''', (key, str(value)))
         self.conn.commit()
 
-    def get_previous_stats(self, board, hours_ago=24):
+    def increment_settings(self, deltas):
         """
-        Get the most recent stats entry that is at least 'hours_ago' old.
-        For now, we just get the most recent *previous* entry to keep it simple,
-        or the one closest to 24h ago if we had a lot of data.
-        
-        Simple logic: Get the latest entry BEFORE the current session (assuming we just saved one).
-        Actually, we usually call this BEFORE saving the current one in the script, 
-        or we just get the latest one and compare.
-        
-        Let's retrieve the most recent entry.
+        Atomically add integer deltas to several settings in one transaction.
+        Safe when multiple processes share the database: the addition happens
+        inside SQLite rather than as a read-modify-write in Python.
         """
+        if not deltas:
+            return
         cursor = self.conn.cursor()
-        # Get the latest entry
-        cursor.execute('''
-            SELECT threads, replies, timestamp 
-            FROM board_stats_history 
-            WHERE board_code = ? AND timestamp < datetime('now', '-12 hours')
-            ORDER BY timestamp DESC 
-            LIMIT 1
-        ''', (board,))
-        row = cursor.fetchone()
-        
-        if row:
-            return {"threads": row[0], "replies": row[1], "timestamp": row[2]}
-        return None
+        cursor.executemany('''
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + CAST(excluded.value AS INTEGER)
+        ''', [(key, str(int(delta))) for key, delta in deltas.items()])
+        self.conn.commit()
+
+    def get_settings_by_prefix(self, prefix):
+        """Retrieve all settings whose key starts with prefix as a dictionary."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT key, value FROM settings WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff"))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def delete_settings(self, keys):
+        """Remove the given settings keys."""
+        if not keys:
+            return
+        cursor = self.conn.cursor()
+        cursor.executemany("DELETE FROM settings WHERE key = ?", [(k,) for k in keys])
+        self.conn.commit()
 
     def add_tracked_keyword(self, user_id, keyword, label=None):
         cursor = self.conn.cursor()
@@ -382,21 +335,23 @@ class AnalysisDB:
             rows = cursor.execute("SELECT user_id, keyword, added_at FROM tracked_keywords").fetchall()
         return rows
         
+    @timed_query("analysis")
     def get_tracked_keywords_stats(self, user_id):
         """
-        Returns keywords with stats for a specific user: {keyword, label, unread_count, latest_match}
+        Returns keywords with stats for a specific user: {keyword, label, unread_count, latest_match}.
+        Counts come from keyword_counters (kept up to date by save_keyword_match and
+        mark_keyword_read), so this is one primary key lookup per keyword.
         """
         cursor = self.conn.cursor()
         query = """
             SELECT 
                 k.keyword, 
                 k.label,
-                COUNT(CASE WHEN m.is_read = 0 THEN 1 END) as unread_count,
-                MAX(m.found_at) as last_match_at
+                COALESCE(c.unread_count, 0) as unread_count,
+                c.last_match_at
             FROM tracked_keywords k
-            LEFT JOIN keyword_matches m ON k.keyword = m.keyword AND k.user_id = m.user_id
+            LEFT JOIN keyword_counters c ON c.user_id = k.user_id AND c.keyword = k.keyword
             WHERE k.user_id = ?
-            GROUP BY k.keyword, k.label
             ORDER BY unread_count DESC, k.label ASC
         """
         rows = cursor.execute(query, (user_id,)).fetchall()
@@ -410,16 +365,18 @@ class AnalysisDB:
             for r in rows
         ]
 
+    @timed_query("analysis")
     def get_keyword_matches(self, user_id, keyword):
         """
         Returns all specific post matches for a keyword.
         """
         cursor = self.conn.cursor()
         query = """
-            SELECT post_id, board, thread_id, comment, found_at, is_read
-            FROM keyword_matches
-            WHERE user_id = ? AND keyword = ?
-            ORDER BY found_at DESC
+            SELECT m.post_id, p.board, p.thread_id, p.snippet, m.found_at, m.is_read
+            FROM keyword_matches m
+            JOIN post_matches p ON p.post_id = m.post_id
+            WHERE m.user_id = ? AND m.keyword = ?
+            ORDER BY m.found_at DESC
         """
         cursor.execute(query, (user_id, keyword))
         rows = cursor.fetchall()
@@ -435,74 +392,244 @@ class AnalysisDB:
             for r in rows
         ]
 
+    @timed_query("analysis")
+    def get_keyword_matches_batch(self, user_id, keyword, after=None, limit=1000):
+        """
+        One page of matches, newest first, for streaming exports. `after` is the
+        (found_at, post_id) of the last row of the previous page (keyset pagination),
+        so each page is an index range scan regardless of how deep the export is.
+        """
+        cursor = self.conn.cursor()
+        if after is None:
+            cursor.execute('''
+                SELECT m.post_id, p.board, p.thread_id, p.snippet, m.found_at, m.is_read
+                FROM keyword_matches m
+                JOIN post_matches p ON p.post_id = m.post_id
+                WHERE m.user_id = ? AND m.keyword = ?
+                ORDER BY m.found_at DESC, m.post_id DESC
+                LIMIT ?
+            ''', (user_id, keyword, limit))
+        else:
+            cursor.execute('''
+                SELECT m.post_id, p.board, p.thread_id, p.snippet, m.found_at, m.is_read
+                FROM keyword_matches m
+                JOIN post_matches p ON p.post_id = m.post_id
+                WHERE m.user_id = ? AND m.keyword = ? AND (m.found_at, m.post_id) < (?, ?)
+                ORDER BY m.found_at DESC, m.post_id DESC
+                LIMIT ?
+            ''', (user_id, keyword, after[0], after[1], limit))
+        return [
+            {
+                "post_id": r[0],
+                "board": r[1],
+                "thread_id": r[2],
+                "comment": r[3],
+                "found_at": r[4],
+                "is_read": r[5]
+            }
+            for r in cursor.fetchall()
+        ]
+
+    @timed_query("analysis")
     def mark_keyword_read(self, user_id, keyword):
         cursor = self.conn.cursor()
-        cursor.execute("UPDATE keyword_matches SET is_read = 1 WHERE user_id = ? AND keyword = ?", (user_id, keyword))
+        # Only the unread rows are rewritten; already-read history is left alone
+        cursor.execute("UPDATE keyword_matches SET is_read = 1 WHERE user_id = ? AND keyword = ? AND is_read = 0", (user_id, keyword))
+        cursor.execute("UPDATE keyword_counters SET unread_count = 0 WHERE user_id = ? AND keyword = ?", (user_id, keyword))
         self.conn.commit()
 
+    @timed_query("analysis")
     def save_keyword_match(self, user_id, keyword, board, thread_id, post_id, comment):
+        """
+        Returns the match as served by the API if it is new, None if it was already saved.
+        The post itself is stored once in post_matches, shared by every user/keyword matching it.
+        """
         cursor = self.conn.cursor()
         now = int(time.time())
         cursor.execute('''
-            INSERT OR IGNORE INTO keyword_matches (user_id, post_id, keyword, board, thread_id, comment, found_at, is_read)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-        ''', (user_id, post_id, keyword, board, thread_id, comment, now))
+            INSERT OR IGNORE INTO post_matches (post_id, board, thread_id, snippet, first_seen)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (post_id, board, thread_id, comment, now))
+        cursor.execute('''
+            INSERT OR IGNORE INTO keyword_matches (user_id, post_id, keyword, found_at, is_read)
+            VALUES (?, ?, ?, ?, 0)
+        ''', (user_id, post_id, keyword, now))
+        if cursor.rowcount != 1:
+            self.conn.commit()
+            return None
+        cursor.execute('''
+            INSERT INTO keyword_counters (user_id, keyword, unread_count, last_match_at) VALUES (?, ?, 1, ?)
+            ON CONFLICT(user_id, keyword) DO UPDATE SET
+                unread_count = unread_count + 1,
+                last_match_at = MAX(COALESCE(last_match_at, 0), excluded.last_match_at)
+        ''', (user_id, keyword, now))
         self.conn.commit()
+        return {"keyword": keyword, "post_id": post_id, "board": board, "thread_id": thread_id,
+                "comment": comment, "found_at": now, "is_read": 0}
+
+    def get_keyword_match_cursor(self):
+        """Latest keyword_matches rowid; new matches are always appended above it."""
+        cursor = self.conn.cursor()
+        return cursor.execute("SELECT MAX(rowid) FROM keyword_matches").fetchone()[0] or 0
+
+    @timed_query("analysis")
+    def get_keyword_matches_since(self, rowid, limit=500):
+        """Returns [(rowid, user_id, match), ...] for matches saved after `rowid`, oldest first."""
+        cursor = self.conn.cursor()
+        rows = cursor.execute('''
+            SELECT m.rowid, m.user_id, m.keyword, m.post_id, p.board, p.thread_id, p.snippet, m.found_at, m.is_read
+            FROM keyword_matches m
+            JOIN post_matches p ON p.post_id = m.post_id
+            WHERE m.rowid > ? ORDER BY m.rowid LIMIT ?
+        ''', (rowid, limit)).fetchall()
+        return [(r[0], r[1], {"keyword": r[2], "post_id": r[3], "board": r[4], "thread_id": r[5],
+                              "comment": r[6], "found_at": r[7], "is_read": r[8]}) for r in rows]
 
     def save_analysis(self, boards, analysis_json):
         """
         Saves the AI-generated analysis JSON into the database.
+        Returns the number of opportunities saved.
+        """
+        return len(self.save_analysis_bulk(boards, analysis_json))
+
+    @timed_query("analysis")
+    def save_analysis_bulk(self, boards, analysis_json):
+        """
+        Saves all opportunities and their evidence in a single short write transaction.
+
+        Discoveries whose SimHash is within MAX_DISTANCE bits of a stored opportunity with
+        the same intent (or of an earlier one in the same batch) are merged into it: its
+        recurrence_count is bumped and the new evidence is appended instead of inserting a row.
+        Returns the opportunity id each discovery was saved to, in input order.
         """
-        cursor = self.conn.cursor()
         source_boards = ",".join(boards) if isinstance(boards, list) else boards
-        
         opportunities = analysis_json.get("opportunities", [])
-        
-        for opp in opportunities:
-            # Insert opportunity
-            cursor.execute('''
-                INSERT INTO opportunities (
-                    source_boards, category, pain_points, emerging_trend, 
-                    solution, product_concept, target_audience,
-                    market_score, complexity, market_size, product_domain,
-                    intent_category, flair_type, core_pain
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                source_boards,
-                opp.get("category"),
-                json.dumps(opp.get("pain_points", [])),
-                opp.get("emerging_trend"),
-                opp.get("solution"),
-                opp.get("product_concept"),
-                opp.get("target_audience"),
-                opp.get("market_score"),
-                opp.get("complexity"),
-                opp.get("market_size"),
-                opp.get("product_domain"),
-                opp.get("intent_category"),
-                opp.get("flair_type"),
-                opp.get("core_pain")
-            ))
-            
-            opportunity_id = cursor.lastrowid
-            
-            # Insert evidence
-            evidence_list = opp.get("evidence", [])
-            for ev in evidence_list:
-                cursor.execute('''
-                    INSERT INTO evidence (
-                        opportunity_id, post_id, quote, relevance
-                    ) VALUES (?, ?, ?, ?)
-                ''', (
-                    opportunity_id,
-                    ev.get("post_id"),
-                    ev.get("quote"),
-                    ev.get("relevance")
-                ))
-        
-        self.conn.commit()
-        return len(opportunities)
+        if not opportunities:
+            return []
+
+        # Signatures are pure CPU work; compute them before taking the write lock
+        sigs = [simhash(opportunity_text(opp)) for opp in opportunities]
+
+        cursor = self.conn.cursor()
+        try:
+            # Own the write transaction and take the lock up front, so the near-duplicate
+            # lookups and the inserts see the same table state
+            if self.conn.in_transaction:
+                self.conn.commit()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            targets = []      # per discovery: ("existing", opportunity_id) or ("new", index into new_opps)
+            new_opps = []     # [discovery, signature, recurrence_count]
+            merged = {}       # existing id -> [source_boards, extra recurrences]
+            batch_bands = {}  # (band, value) -> indexes into new_opps
+
+            for opp, sig in zip(opportunities, sigs):
+                intent = opp.get("intent_category")
+                match = self._find_near_duplicate(cursor, sig, intent)
+                if match:
+                    opp_id, existing_boards = match
+                    entry = merged.setdefault(opp_id, [existing_boards or "", 0])
+                    entry[1] += 1
+                    entry[0] = _merge_boards(entry[0], source_boards)
+                    targets.append(("existing", opp_id))
+                    continue
+
+                local = None
+                for key in bands(sig):
+                    for idx in batch_bands.get(key, []):
+                        other = new_opps[idx]
+                        if other[0].get("intent_category") == intent and hamming(sig, other[1]) <= MAX_DISTANCE:
+                            local = idx
+                            break
+                    if local is not None:
+                        break
+                if local is not None:
+                    new_opps[local][2] += 1
+                    targets.append(("new", local))
+                    continue
+
+                targets.append(("new", len(new_opps)))
+                for key in bands(sig):
+                    batch_bands.setdefault(key, []).append(len(new_opps))
+                new_opps.append([opp, sig, 1])
+
+            new_ids = self._insert_opportunities(cursor, source_boards, new_opps)
+            opportunity_ids = [ref if kind == "existing" else new_ids[ref] for kind, ref in targets]
+
+            if merged:
+                cursor.executemany('''
+                    UPDATE opportunities
+                    SET recurrence_count = COALESCE(recurrence_count, 1) + ?,
+                        last_seen = CURRENT_TIMESTAMP,
+                        source_boards = ?
+                    WHERE id = ?
+                ''', [(extra, merged_boards, opp_id) for opp_id, (merged_boards, extra) in merged.items()])
+
+            evidence_rows = [
+                (opportunity_id, ev.get("post_id"), ev.get("quote"), ev.get("relevance"))
+                for opportunity_id, opp in zip(opportunity_ids, opportunities)
+                for ev in opp.get("evidence", [])
+            ]
+            cursor.executemany('''
+                INSERT INTO evidence (
+                    opportunity_id, post_id, quote, relevance
+                ) VALUES (?, ?, ?, ?)
+            ''', evidence_rows)
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        if merged:
+            print(f"[*] Merged {len(opportunities) - len(new_opps)} near-duplicate discoveries into existing opportunities")
+        return opportunity_ids
+
+    def _insert_opportunities(self, cursor, source_boards, new_opps):
+        """Inserts new opportunities with their signatures; must run inside the write transaction."""
+        if not new_opps:
+            return []
+
+        opp_rows = [(
+            source_boards,
+            opp.get("category"),
+            json.dumps(opp.get("pain_points", [])),
+            opp.get("emerging_trend"),
+            opp.get("solution"),
+            opp.get("product_concept"),
+            opp.get("target_audience"),
+            opp.get("market_score"),
+            opp.get("complexity"),
+            opp.get("market_size"),
+            opp.get("product_domain"),
+            opp.get("intent_category"),
+            opp.get("flair_type"),
+            opp.get("core_pain"),
+            recurrences
+        ) for opp, _, recurrences in new_opps]
+
+        # RETURNING gives each row's real id (executemany would discard it)
+        new_ids = [cursor.execute('''
+            INSERT INTO opportunities (
+                source_boards, category, pain_points, emerging_trend,
+                solution, product_concept, target_audience,
+                market_score, complexity, market_size, product_domain,
+                intent_category, flair_type, core_pain, recurrence_count
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        ''', row).fetchone()[0] for row in opp_rows]
+
+        cursor.executemany(
+            "INSERT INTO opportunity_signatures (opportunity_id, simhash, intent_category) VALUES (?, ?, ?)",
+            [(opp_id, sig, opp.get("intent_category")) for opp_id, (opp, sig, _) in zip(new_ids, new_opps)]
+        )
+        cursor.executemany(
+            "INSERT INTO opportunity_sig_bands (band, value, opportunity_id) VALUES (?, ?, ?)",
+            [(band, value, opp_id) for opp_id, (_, sig, _) in zip(new_ids, new_opps) for band, value in bands(sig)]
+        )
+        return new_ids
 
+    @timed_query("analysis")
     def get_latest_analysis(self, boards=None, score_min=None, complexity=None, market_size=None, intent_category=None, flair_type=None):
         """
         Retrieves the most recent opportunities for specific boards with optional filters.
@@ -580,10 +707,13 @@ class AnalysisDB:
                 "flair_type": row[13],
                 "core_pain": row[14],
                 "timestamp": row[15],
+                "recurrence_count": row[16] or 1,
+                "last_seen": row[17],
                 "evidence": evidence
             })
         return result
 
+    @timed_query("analysis")
     def search_opportunities(self, query=None, boards=None, score_min=None, complexity=None, market_size=None, intent_category=None, flair_type=None, category=None, limit=50, offset=0, sort_by="date", sort_order="desc"):
         """
         Search opportunities with full filtering and text search.
@@ -642,6 +772,8 @@ class AnalysisDB:
                 "flair_type": row[13],
                 "core_pain": row[14],
                 "timestamp": row[15],
+                "recurrence_count": row[16] or 1,
+                "last_seen": row[17],
                 "evidence": evidence
             })
             
@@ -714,6 +846,7 @@ class AnalysisDB:
             
         return where_clause, params
 
+    @timed_query("analysis")
     def get_search_aggregations(self, query=None, boards=None, score_min=None, complexity=None, market_size=None, intent_category=None, flair_type=None, category=None):
         """
         Calculate aggregations for the filtered result set.
@@ -1,12 +1,19 @@
 import os
+import re
+import time
+import asyncio
 import logging
+import sqlite3
 from typing import Optional, List
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Depends, Header, status
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, Depends, Header, Request, Response, status
 from fastapi.security import APIKeyHeader
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables from project root .env.local (if present)
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env.local'))
@@ -16,10 +23,16 @@ from scheduler_service import SchedulerService
 from db_manager import ArchiveDB
 from analysis_db import AnalysisDB
 from search import keyword_search
-from board_stats import get_board_stats
-from jose import jwt, JWTError
-import razorpay
 from users_db import UserDB
+from db_executor import DBExecutor, DBBusyError
+from responses import conditional, make_etag, json_response, dumps
+from token_cache import TokenCache
+from thread_cache import ThreadCache
+from singleflight import SingleFlight
+from match_broker import MatchBroker, RESYNC
+from stream_tickets import StreamTickets
+from metrics import REGISTRY, CACHE_ENTRIES, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import query_log
 
 NEXTAUTH_SECRET = os.getenv("NEXTAUTH_SECRET", "supersecretkey") # Should match Next.js secret
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID")
@@ -29,12 +42,42 @@ ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "admin-secret")
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "admin-secret")
 ADMIN_EMAILS = os.getenv("ADMIN_EMAILS", "").split(",")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+# When false, the monitor and scheduler run in their own process (`python run.py monitor scheduler`)
+EMBEDDED_WORKERS = os.getenv("EMBEDDED_WORKERS", "true").lower() == "true"
 
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+_razorpay_client = None
+
+
+def get_razorpay_client():
+    """Razorpay client, created on first payment call; importing the SDK is slow and most workers never need it."""
+    global _razorpay_client
+    if _razorpay_client is None:
+        import razorpay
+        _razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+    return _razorpay_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("rootsearch_api")
 
+
+class _RedactCredentialsFilter(logging.Filter):
+    """Masks credential query parameters (e.g. /keywords/stream?ticket=) in uvicorn's access log."""
+    PATTERN = re.compile(r"([?&](?:ticket|token)=)[^&\s]*")
+
+    def filter(self, record):
+        if isinstance(record.args, tuple) and len(record.args) >= 3 and isinstance(record.args[2], str):
+            args = list(record.args)
+            args[2] = self.PATTERN.sub(r"\1[redacted]", args[2])
+            record.args = tuple(args)
+        return True
+
+
+logging.getLogger("uvicorn.access").addFilter(_RedactCredentialsFilter())
+
+# Responses smaller than this are sent uncompressed; gzip only pays off on large bodies
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
 # Conditionally enable docs
 docs_url = "/docs" if ENVIRONMENT == "development" else None
 redoc_url = "/redoc" if ENVIRONMENT == "development" else None
@@ -48,11 +91,103 @@ app.add_middleware(
     allow_methods=["*"], 
     allow_headers=["*"]
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("rootsearch_http_request_seconds", "API latency until response headers are ready, by route template.", ("method", "route", "status"))
+DB_POOL_ACTIVE = REGISTRY.gauge("rootsearch_db_pool_active", "Database pool calls currently running.", ("db",))
+DB_POOL_QUEUED = REGISTRY.gauge("rootsearch_db_pool_queued", "Database pool calls waiting for a worker.", ("db",))
+THREAD_CACHE_POSTS = REGISTRY.gauge("rootsearch_thread_cache_posts", "Posts held by the thread cache.")
+FLIGHTS_IN_FLIGHT = REGISTRY.gauge("rootsearch_singleflight_in_flight", "Shared tasks currently in flight.", ("name",))
+KEYWORD_STREAMS = REGISTRY.gauge("rootsearch_keyword_streams", "Open keyword match streams.")
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template (/threads/{board}/{thread_id}) so label cardinality stays bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+# New keyword matches pushed to /keywords/stream subscribers
+match_broker = MatchBroker(
+    max_queue=int(os.getenv("KEYWORD_STREAM_QUEUE", "100")),
+    max_per_user=int(os.getenv("KEYWORD_STREAM_MAX_PER_USER", "5"))
+)
+KEYWORD_STREAM_HEARTBEAT = int(os.getenv("KEYWORD_STREAM_HEARTBEAT", "15"))
+# How often to look for matches saved by a sweep running in another process
+KEYWORD_STREAM_POLL = float(os.getenv("KEYWORD_STREAM_POLL", "5"))
+# EventSource can't send headers, so /keywords/stream takes a one-time ticket in the URL
+# instead of the session JWT; proxies may log the URL, so tickets expire quickly
+stream_tickets = StreamTickets(NEXTAUTH_SECRET, "keyword_stream", ttl=int(os.getenv("KEYWORD_STREAM_TICKET_TTL", "60")))
 
 # Services
-monitor = MonitorService(interval=int(os.getenv("MONITOR_INTERVAL", "300")))
+monitor = MonitorService(interval=int(os.getenv("MONITOR_INTERVAL", "300")), on_match=match_broker.publish)
 scheduler = SchedulerService()
 
+# Data access: one sized pool per database so slow archive searches can't starve the rest
+archive_executor = DBExecutor(
+    "archive", ArchiveDB,
+    max_workers=int(os.getenv("ARCHIVE_DB_WORKERS", "4")),
+    max_pending=int(os.getenv("ARCHIVE_DB_MAX_PENDING", "64"))
+)
+analysis_executor = DBExecutor(
+    "analysis", AnalysisDB,
+    max_workers=int(os.getenv("ANALYSIS_DB_WORKERS", "4")),
+    max_pending=int(os.getenv("ANALYSIS_DB_MAX_PENDING", "64"))
+)
+users_executor = DBExecutor(
+    "users", UserDB,
+    max_workers=int(os.getenv("USERS_DB_WORKERS", "2")),
+    max_pending=int(os.getenv("USERS_DB_MAX_PENDING", "32"))
+)
+db_executors = (archive_executor, analysis_executor, users_executor)
+
+# Board stats are served from cache; older than this triggers a background refresh
+BOARD_STATS_MAX_AGE = int(os.getenv("BOARD_STATS_MAX_AGE", "3600"))
+# Longest a request waits on a live catalog fetch when a board has no cached stats
+BOARD_STATS_FETCH_TIMEOUT = float(os.getenv("BOARD_STATS_FETCH_TIMEOUT", "3"))
+# Upper bound on /boards/{board}/history points per request
+BOARD_HISTORY_MAX_POINTS = int(os.getenv("BOARD_HISTORY_MAX_POINTS", "720"))
+board_stats_flight = SingleFlight("board_stats")
+
+# Identical concurrent searches share one in-flight query (e.g. everyone searching a trending topic)
+search_flight = SingleFlight("search")
+
+
+async def coalesced(executor, fn, *args, **kwargs):
+    """executor.run(fn, ...) shared by all concurrent callers with the same arguments."""
+    key = (executor.name, fn, args, tuple(sorted(kwargs.items())))
+    return await search_flight.do(key, lambda: executor.run(fn, *args, **kwargs))
+
+# Rows per keyset page in NDJSON exports; bounds export memory regardless of result size
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Verified JWTs, so repeat requests with the same session token skip HMAC + parsing
+jwt_cache = TokenCache(
+    max_size=int(os.getenv("JWT_CACHE_SIZE", "10000")),
+    max_ttl=int(os.getenv("JWT_CACHE_MAX_TTL", "3600"))
+)
+
+# Recently opened threads; a scraper update only fetches the posts appended since
+thread_cache = ThreadCache(
+    max_threads=int(os.getenv("THREAD_CACHE_SIZE", "256")),
+    max_posts=int(os.getenv("THREAD_CACHE_MAX_POSTS", "50000"))
+)
+THREAD_PAGE_MAX = int(os.getenv("THREAD_PAGE_MAX", "500"))
+
+
+@app.exception_handler(DBBusyError)
+async def db_busy_handler(request: Request, exc: DBBusyError):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 admin_header_scheme = APIKeyHeader(name="X-Admin-Key", auto_error=False)
 
 async def verify_admin_key(key: str = Depends(admin_header_scheme)):
@@ -65,28 +200,71 @@ async def verify_admin_key(key: str = Depends(admin_header_scheme)):
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
+    match_broker.bind(asyncio.get_running_loop())
+    app.state.match_tailer = asyncio.create_task(_tail_keyword_matches())
+    query_log.start_summary_logger()
+    if not EMBEDDED_WORKERS:
+        logger.info("Background services run in a separate process (EMBEDDED_WORKERS=false)")
+        return
+    # With several uvicorn workers only the first to take each service lock starts it
     logger.info("Starting services on startup: monitor and scheduler")
     monitor.start()
     scheduler.start()
 
 
 @app.on_event("shutdown")
-def shutdown():
+async def shutdown():
     logger.info("Shutting down services")
-    monitor.stop()
+    app.state.match_tailer.cancel()
+    await run_in_threadpool(monitor.stop)
     scheduler.shutdown()
+    for executor in db_executors:
+        executor.shutdown()
 
 
 @app.get("/health")
-def health():
+async def health():
     return {
         "monitor_running": monitor.running(),
-        "scheduler_running": scheduler._scheduler.running,
-        "environment": ENVIRONMENT
+        "scheduler_running": scheduler.running(),
+        "environment": ENVIRONMENT,
+        "db_pools": {executor.name: executor.stats() for executor in db_executors},
+        "jwt_cache": jwt_cache.stats(),
+        "thread_cache": thread_cache.stats(),
+        "board_stats_refresh": board_stats_flight.stats(),
+        "search_coalescing": search_flight.stats(),
+        "keyword_stream": match_broker.stats()
     }
 
-def verify_jwt(authorization: str = Header(None)):
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format. Not routed through nginx; scrape the backend directly."""
+    # Counters are incremented as events happen; point-in-time sizes are sampled here
+    for executor in db_executors:
+        stats = executor.stats()
+        DB_POOL_ACTIVE.set(stats["active"], db=executor.name)
+        DB_POOL_QUEUED.set(stats["queued"], db=executor.name)
+    CACHE_ENTRIES.set(jwt_cache.stats()["size"], cache=jwt_cache.name)
+    thread_stats = thread_cache.stats()
+    CACHE_ENTRIES.set(thread_stats["threads"], cache=thread_cache.name)
+    THREAD_CACHE_POSTS.set(thread_stats["posts"])
+    for flight in (board_stats_flight, search_flight):
+        FLIGHTS_IN_FLIGHT.set(flight.stats()["in_flight"], name=flight.name)
+    KEYWORD_STREAMS.set(match_broker.stats()["streams"])
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _decode_jwt(token):
+    # Deferred import: python-jose is only needed on token cache misses
+    from jose import jwt, JWTError
+    try:
+        return jwt.decode(token, NEXTAUTH_SECRET, algorithms=["HS256"])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+
+async def verify_jwt(authorization: str = Header(None)):
     """Verifies the JWT token and returns the user's plan."""
     if not authorization:
         # For prototype simplicity: If no header, assume unauthorized or free?
@@ -95,10 +273,11 @@ def verify_jwt(authorization: str = Header(None)):
     
     try:
         token = authorization.split(" ")[1]
-        payload = jwt.decode(token, NEXTAUTH_SECRET, algorithms=["HS256"])
+        payload = jwt_cache.get(token)
+        if payload is None:
+            payload = _decode_jwt(token)
+            jwt_cache.put(token, payload)
         return payload # Should contain 'plan_type'
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     except IndexError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid header format")
 
@@ -108,88 +287,179 @@ class MonitorStartRequest(BaseModel):
     boards: Optional[List[str]] = None
 
 
+@app.get("/admin/services", dependencies=[Depends(verify_admin_key)])
+async def admin_services():
+    """Background services in this process and the host:pid holding each service lock."""
+    return {
+        "monitor": {"running": monitor.running(), "holder": monitor.lock.holder()},
+        "scheduler": {"running": scheduler.running(), "holder": scheduler.lock.holder()}
+    }
+
+
 @app.post("/admin/monitor/start", dependencies=[Depends(verify_admin_key)])
-def admin_monitor_start(payload: MonitorStartRequest):
+async def admin_monitor_start(payload: MonitorStartRequest):
     if payload.interval:
         monitor.interval = payload.interval
     # Allow empty list to mean "no specific boards"
     if payload.boards is not None:
         monitor.boards = payload.boards
-    monitor.start()
+    if not monitor.start():
+        raise HTTPException(status_code=409, detail=f"Monitor is running in another process ({monitor.lock.holder()})")
     return {"status": "started", "interval": monitor.interval, "boards": (monitor.boards or "all")}
 
 
 @app.post("/admin/monitor/stop", dependencies=[Depends(verify_admin_key)])
-def admin_monitor_stop():
-    monitor.stop()
+async def admin_monitor_stop():
+    # stop() joins the monitor thread for up to 10s; keep that off the event loop
+    await run_in_threadpool(monitor.stop)
     return {"status": "stopped"}
 
 
+@app.get("/admin/slow-queries", dependencies=[Depends(verify_admin_key)])
+async def admin_slow_queries(limit: int = 50, clear: bool = False):
+    """Recent slow statements with their query plans (enable with SLOW_QUERY_MS)."""
+    result = {
+        "enabled": query_log.enabled(),
+        "threshold_ms": query_log.SLOW_QUERY_MS,
+        "summary": query_log.summary(),
+        "recent": query_log.recent(limit)
+    }
+    if clear:
+        query_log.clear()
+    return result
+
+
 @app.post("/admin/run-analysis", dependencies=[Depends(verify_admin_key)])
-def trigger_analysis(background_tasks: BackgroundTasks):
+async def trigger_analysis(background_tasks: BackgroundTasks):
     # Run analysis in background (non-blocking)
     background_tasks.add_task(scheduler.run_analysis_once)
     return {"status": "enqueued"}
 
 
 @app.get("/boards")
-def list_boards():
-    db = ArchiveDB()
-    return {"boards": db.get_all_stored_boards()}
+async def list_boards(request: Request, response: Response):
+    generation, updated_at = await archive_executor.run("get_generation", "threads")
+    not_modified = conditional(request, response, make_etag("boards", generation), updated_at)
+    if not_modified:
+        return not_modified
+    return {"boards": await archive_executor.run("get_all_stored_boards")}
 
 
 from pathlib import Path
 import json
 
 
+async def _refresh_board_stats(board):
+    """Live catalog fetch off the event loop, then growth/history/cache writes on the analysis pool."""
+    # board_stats pulls in requests and the scraper; only stats endpoints need them
+    from board_stats import get_board_stats, record_board_stats
+    stats = await run_in_threadpool(get_board_stats, board, quiet=True)
+    if stats is None:
+        return None
+    return await analysis_executor.run(record_board_stats, board, stats)
+
+
 @app.get("/boards/{board}/stats")
-def board_stats(board: str):
-    """Return cached board stats from Database."""
+async def board_stats(board: str, response: Response):
+    """Return cached board stats from Database, refreshing stale entries in the background."""
+    cached = None
     try:
-        adb = AnalysisDB()
-        all_stats = adb.get_all_cached_stats()
-        if board in all_stats:
-            return all_stats[board]
+        cached = await analysis_executor.run("get_cached_stats", board)
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching cached stats from DB: {e}")
 
-    # Fallback: perform live fetch
-    stats = get_board_stats(board, quiet=True)
+    if cached:
+        stats, age = cached
+        stale = age > BOARD_STATS_MAX_AGE
+        if stale:
+            board_stats_flight.start(board, lambda: _refresh_board_stats(board))
+        response.headers["Age"] = str(age)
+        return {**stats, "age_seconds": age, "stale": stale}
+
+    # Cache miss: one live fetch per board, and never wait on 4chan longer than the timeout
+    try:
+        stats = await board_stats_flight.do(board, lambda: _refresh_board_stats(board), timeout=BOARD_STATS_FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Board stats are being fetched, retry shortly", headers={"Retry-After": "5"})
+    except DBBusyError:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching live stats for /{board}/: {e}")
+        stats = None
     if stats is None:
         raise HTTPException(status_code=404, detail="Board stats not found")
-    return stats
+    return {**stats, "age_seconds": 0, "stale": False}
+
+
+@app.get("/boards/{board}/history")
+async def board_history(
+    board: str,
+    request: Request,
+    response: Response,
+    resolution: str = Query("hour", pattern="^(hour|day)$"),
+    points: int = Query(48, ge=1, le=BOARD_HISTORY_MAX_POINTS)
+):
+    """Board activity series from the hourly/daily rollups, oldest first, with growth and velocity per bucket."""
+    series = await analysis_executor.run("get_board_history", board, resolution, points)
+    last = series[-1] if series else {}
+    etag = make_etag("board_history", board, resolution, points, last.get("t"), last.get("samples"))
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    return json_response({"board": board, "resolution": resolution, "points": series}, response)
 
 
 @app.get("/boards/stats")
-def all_boards_stats():
+async def all_boards_stats(request: Request, response: Response):
     """Return the cached stats for all boards from Database."""
     try:
-        adb = AnalysisDB()
-        return adb.get_all_cached_stats()
+        updated_at, count, version = await analysis_executor.run("get_board_cache_version")
+        not_modified = conditional(request, response, make_etag("boards_stats", updated_at, count, version), updated_at)
+        if not_modified:
+            return not_modified
+        return await analysis_executor.run("get_all_cached_stats")
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Failed to read cached board stats from DB: {e}")
         raise HTTPException(status_code=500, detail="Failed to read cached board stats")
 
 
 @app.get("/stats/global")
-def global_stats():
+async def global_stats(request: Request, response: Response):
     """Return live global stats from the archive."""
     try:
-        db = ArchiveDB()
-        return db.get_global_stats()
+        generation, updated_at = await archive_executor.run("get_generation", "threads")
+        not_modified = conditional(request, response, make_etag("global", generation), updated_at)
+        if not_modified:
+            return not_modified
+        return await archive_executor.run("get_global_stats")
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching global stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _keyword_search(db, q, limit):
+    return keyword_search(q, limit=limit, db=db)
+
+
 @app.get("/search")
-def search(q: str, limit: int = 50):
-    return keyword_search(q, limit=limit)
+async def search(q: str, limit: int = 50):
+    try:
+        return json_response(await coalesced(archive_executor, _keyword_search, q, limit))
+    except sqlite3.OperationalError as e:
+        raise _invalid_fts_query(e)
 
 
 
 @app.get("/opportunities")
-def opportunities(
+async def opportunities(
+    request: Request,
+    response: Response,
     board: Optional[str] = Query(None, description="Board code(s) to filter by"),
     limit: int = 5,
     score_min: Optional[int] = Query(None, description="Minimum market score"),
@@ -210,8 +480,14 @@ def opportunities(
         size = None
         flair = None
     try:
-        adb = AnalysisDB()
-        result = adb.get_latest_analysis(
+        # Results depend on the stored data, the caller's plan and the query string
+        opp_seq, evidence_seq = await analysis_executor.run("get_opportunities_version")
+        etag = make_etag("opportunities", opp_seq, evidence_seq, user.get("plan_type"), request.url.query)
+        not_modified = conditional(request, response, etag, private=True)
+        if not_modified:
+            return not_modified
+        result = await analysis_executor.run(
+            "get_latest_analysis",
             boards=board,
             score_min=score_min,
             complexity=complexity,
@@ -219,7 +495,9 @@ def opportunities(
             intent_category=intent,
             flair_type=flair
         )
-        return result[:limit] if limit > 0 else result
+        return json_response(result[:limit] if limit > 0 else result, response)
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching opportunities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -227,7 +505,7 @@ def opportunities(
 
 
 @app.get("/advanced-search")
-def advanced_search(
+async def advanced_search(
     q: Optional[str] = Query(None),
     mode: str = Query("analyzed", pattern="^(live|analyzed)$"),
     page: int = Query(1, ge=1),
@@ -260,8 +538,9 @@ def advanced_search(
         # Let's leave score_min available for free for now to confirm "valid signals".
     
     if mode == "analyzed":
-        adb = AnalysisDB()
-        results, total = adb.search_opportunities(
+        results, total = await coalesced(
+            analysis_executor,
+            "search_opportunities",
             query=q,
             boards=boards,
             score_min=score_min,
@@ -277,7 +556,9 @@ def advanced_search(
         )
         
         # Calculate Aggregations for visualisations
-        aggregations = adb.get_search_aggregations(
+        aggregations = await coalesced(
+            analysis_executor,
+            "get_search_aggregations",
             query=q,
             boards=boards,
             score_min=score_min,
@@ -288,7 +569,7 @@ def advanced_search(
             category=category
         )
         
-        return {
+        return json_response({
             "results": results,
             "meta": {
                 "total": total,
@@ -297,10 +578,9 @@ def advanced_search(
                 "mode": "analyzed"
             },
             "aggregations": aggregations
-        }
+        })
 
     else: # mode == "live"
-        db = ArchiveDB()
         # Live search typically only supports basic text search + boards
         # We can implement board filtering in ArchiveDB.search if needed, 
         # but the current implementation extracts board from query or result?
@@ -308,9 +588,12 @@ def advanced_search(
         # only text match. Supporting board filter in live search would require DB update.
         # For now, we search all.
         
-        results, total, aggregations = db.search(q, limit=limit, offset=offset)
+        try:
+            results, total, aggregations = await coalesced(archive_executor, "search", q, limit=limit, offset=offset)
+        except sqlite3.OperationalError as e:
+            raise _invalid_fts_query(e)
         
-        return {
+        return json_response({
             "results": results,
             "meta": {
                 "total": total,
@@ -319,19 +602,110 @@ def advanced_search(
                 "mode": "live"
             },
             "aggregations": aggregations
-        }
+        })
+
+async def _load_thread(board, thread_id, version):
+    """Thread from the LRU, fetching only the posts after the cached tail when the thread has moved on."""
+    key = (board, thread_id)
+    entry, fresh = thread_cache.get(key, version)
+    if fresh:
+        return entry
+    if entry is None:
+        thread = await archive_executor.run("get_thread", board, thread_id)
+        return thread_cache.store(key, thread, version) if thread else None
+    tail = entry["ids"][-1] if entry["ids"] else None
+    thread = await archive_executor.run("get_thread", board, thread_id, tail)
+    return thread_cache.extend(key, entry, thread, version) if thread else None
 
 @app.get("/threads/{board}/{thread_id}")
-def get_thread_details(board: str, thread_id: int, user: dict = Depends(verify_jwt)):
-    """Return full thread content including all posts."""
+async def get_thread_details(
+    board: str,
+    thread_id: int,
+    request: Request,
+    response: Response,
+    after_post_id: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=THREAD_PAGE_MAX),
+    user: dict = Depends(verify_jwt)
+):
+    """Return thread content; after_post_id/limit page through long threads (next_after_post_id is the next cursor)."""
     if user.get("plan_type") != "pro":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Thread context is a Pro feature.")
 
-    db = ArchiveDB()
-    thread_data = db.get_thread(board, thread_id)
-    if not thread_data:
+    # insert_thread moves last_modified forward whenever the newest post or the counts change
+    version = await archive_executor.run("get_thread_version", board, thread_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    last_modified = version[0]
+    etag = make_etag("thread", board, thread_id, *version, after_post_id, limit)
+    not_modified = conditional(request, response, etag, last_modified, private=True)
+    if not_modified:
+        return not_modified
+
+    thread = await _load_thread(board, thread_id, tuple(version))
+    if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
-    return thread_data
+    return json_response(ThreadCache.page(thread, after_post_id, limit), response)
+
+def _ndjson_export(fetch_page, page_key, filename, first_page):
+    """
+    Streams `first_page` and then fetch_page(after) results as NDJSON, one keyset page at
+    a time. Callers fetch the first page before responding so a bad request still gets a
+    proper error status. Each page is a separate executor call, so no connection or read
+    transaction is held between chunks and a slow client only delays its own next page.
+    """
+    async def body():
+        rows = first_page
+        while True:
+            if not rows:
+                return
+            yield b"".join(dumps(row) + b"\n" for row in rows)
+            if len(rows) < EXPORT_BATCH_SIZE:
+                return
+            after = page_key(rows[-1])
+            for attempt in range(10):
+                try:
+                    rows = await fetch_page(after)
+                    break
+                except DBBusyError:
+                    # Headers are already sent, so back off instead of failing the export
+                    await asyncio.sleep(0.5 * (attempt + 1))
+                except Exception as e:
+                    logger.error(f"Export {filename} failed: {e}")
+                    yield dumps({"error": "Export failed"}) + b"\n"
+                    return
+            else:
+                logger.error(f"Export {filename} aborted: database busy")
+                yield dumps({"error": "Database busy"}) + b"\n"
+                return
+
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", filename)[:80] or "export"
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{safe_name}.ndjson"'}
+    )
+
+def _invalid_fts_query(e: sqlite3.OperationalError):
+    """400 for FTS5 query syntax errors (unbalanced quotes, unknown columns, ...); anything else is re-raised."""
+    if "locked" in str(e) or "busy" in str(e):
+        raise e
+    return HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+
+
+@app.get("/search/export")
+async def export_search(q: str, min_timestamp: Optional[int] = None, user: dict = Depends(verify_jwt)):
+    """Stream every live search match as NDJSON, newest first."""
+    if user.get("plan_type") != "pro":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Exports are a Pro feature.")
+
+    def fetch_page(after):
+        return archive_executor.run("search_batch", q, before_post_id=after, limit=EXPORT_BATCH_SIZE, min_timestamp=min_timestamp)
+
+    try:
+        first_page = await fetch_page(None)
+    except sqlite3.OperationalError as e:
+        raise _invalid_fts_query(e)
+    return _ndjson_export(fetch_page, lambda row: row["post_id"], f"search-{q}", first_page)
 
 # ... (Keep existing code)
 
@@ -340,29 +714,124 @@ class KeywordPayload(BaseModel):
     label: Optional[str] = None
 
 @app.get("/keywords")
-def get_keywords(user: dict = Depends(verify_jwt)):
+async def get_keywords(user: dict = Depends(verify_jwt)):
     """Get tracked keywords with stats for the authenticated user."""
     user_id = user.get("sub")
     try:
-        adb = AnalysisDB()
-        return {"keywords": adb.get_tracked_keywords_stats(user_id)}
+        return {"keywords": await analysis_executor.run("get_tracked_keywords_stats", user_id)}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching keywords for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _tail_keyword_matches():
+    """
+    Publishes matches saved by a sweep in another process (or another API worker) by
+    following keyword_matches' rowid. Idle while nobody is subscribed, and skipped while
+    this process runs the monitor, whose sweep publishes directly.
+    """
+    last = None
+    while True:
+        await asyncio.sleep(KEYWORD_STREAM_POLL)
+        if not match_broker.has_subscribers() or monitor.running():
+            last = None
+            continue
+        try:
+            if last is None:
+                last = await analysis_executor.run("get_keyword_match_cursor")
+                continue
+            rows = await analysis_executor.run("get_keyword_matches_since", last)
+            for rowid, user_id, match in rows:
+                match_broker.publish(user_id, match)
+                last = rowid
+        except DBBusyError:
+            continue
+        except Exception as e:
+            logger.error(f"Keyword match tailer failed: {e}")
+
+
+@app.post("/keywords/stream/ticket")
+async def keyword_stream_ticket(user: dict = Depends(verify_jwt)):
+    """Issues a single-use ticket for opening /keywords/stream?ticket= from EventSource."""
+    ticket, expires_in = stream_tickets.issue(user.get("sub"))
+    return {"ticket": ticket, "expires_in": expires_in}
+
+
+@app.get("/keywords/stream")
+async def keyword_stream(request: Request, authorization: str = Header(None), ticket: Optional[str] = None):
+    """
+    Server-Sent Events feed of the caller's new keyword matches. Authenticates with the
+    Authorization header or, for EventSource (which cannot set headers), a ticket from
+    POST /keywords/stream/ticket. Session JWTs are not accepted in the URL: query strings
+    end up in proxy and access logs. A ticket is used up on connect, so clients fetch a
+    fresh one before reconnecting.
+    """
+    if authorization:
+        user_id = (await verify_jwt(authorization)).get("sub")
+    else:
+        user_id = stream_tickets.redeem(ticket) if ticket else None
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or expired stream ticket")
+    if match_broker.at_limit(user_id):
+        raise HTTPException(status_code=429, detail="Too many open keyword streams")
+
+    async def events():
+        # Subscribed here rather than in the handler: the generator's finally only runs once
+        # iteration starts, so a client gone before the first chunk would otherwise leak its slot
+        sub = match_broker.subscribe(user_id)
+        if sub is None:
+            # Lost a race with another stream for the last slot; the status is already sent
+            yield "event: error\ndata: {\"detail\": \"Too many open keyword streams\"}\n\n"
+            return
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), KEYWORD_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                if item is RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    yield f"event: match\ndata: {dumps(item).decode()}\n\n"
+        finally:
+            match_broker.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # nginx: flush each event immediately
+    })
+
+
 @app.get("/keywords/matches")
-def get_keyword_matches(keyword: str, user: dict = Depends(verify_jwt)):
+async def get_keyword_matches(keyword: str, user: dict = Depends(verify_jwt)):
     """Get all specific post matches for a keyword."""
     user_id = user.get("sub")
     try:
-        adb = AnalysisDB()
-        return {"matches": adb.get_keyword_matches(user_id, keyword)}
+        return json_response({"matches": await analysis_executor.run("get_keyword_matches", user_id, keyword)})
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching matches for keyword {keyword}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/keywords/matches/export")
+async def export_keyword_matches(keyword: str, user: dict = Depends(verify_jwt)):
+    """Stream every match for a tracked keyword as NDJSON, newest first."""
+    user_id = user.get("sub")
+
+    def fetch_page(after):
+        return analysis_executor.run("get_keyword_matches_batch", user_id, keyword, after=after, limit=EXPORT_BATCH_SIZE)
+
+    return _ndjson_export(fetch_page, lambda row: (row["found_at"], row["post_id"]), f"matches-{keyword}", await fetch_page(None))
+
 @app.post("/keywords")
-def add_keyword(payload: KeywordPayload, user: dict = Depends(verify_jwt)):
+async def add_keyword(payload: KeywordPayload, user: dict = Depends(verify_jwt)):
     """Add or update a tracked keyword for the authenticated user."""
     user_id = user.get("sub")
     
@@ -371,21 +840,23 @@ def add_keyword(payload: KeywordPayload, user: dict = Depends(verify_jwt)):
          raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Keyword tracking is a Pro feature.")
     
     try:
-        adb = AnalysisDB()
-        adb.add_tracked_keyword(user_id, payload.keyword, payload.label)
+        await analysis_executor.run("add_tracked_keyword", user_id, payload.keyword, payload.label)
         return {"status": "success", "keyword": payload.keyword}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error adding keyword for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/keywords/{keyword}/read")
-def mark_keyword_read(keyword: str, user: dict = Depends(verify_jwt)):
+async def mark_keyword_read(keyword: str, user: dict = Depends(verify_jwt)):
     """Mark all matches for a keyword as read for the authenticated user."""
     user_id = user.get("sub")
     try:
-        adb = AnalysisDB()
-        adb.mark_keyword_read(user_id, keyword)
+        await analysis_executor.run("mark_keyword_read", user_id, keyword)
         return {"status": "success"}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error marking keyword read for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -396,39 +867,42 @@ class SavedItemPayload(BaseModel):
     data: dict
 
 @app.get("/saved")
-def get_saved_items(user: dict = Depends(verify_jwt)):
+async def get_saved_items(user: dict = Depends(verify_jwt)):
     """Get all saved items for the user."""
     user_id = user.get("sub")
     try:
-        adb = AnalysisDB()
-        return adb.get_saved_items(user_id)
+        return await analysis_executor.run("get_saved_items", user_id)
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching saved items for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/saved")
-def save_item(payload: SavedItemPayload, user: dict = Depends(verify_jwt)):
+async def save_item(payload: SavedItemPayload, user: dict = Depends(verify_jwt)):
     """Save an opportunity/item."""
     user_id = user.get("sub")
     # Free tier limit? Plan says "Unlimited Collections & Saves" for Pro.
     # Implicitly Free checks might exist, but for now implementing basic save.
     
     try:
-        adb = AnalysisDB()
-        adb.save_item(user_id, payload.opportunityId, payload.data)
+        await analysis_executor.run("save_item", user_id, payload.opportunityId, payload.data)
         return {"status": "success"}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error saving item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/saved/{opportunity_id}")
-def unsave_item(opportunity_id: int, user: dict = Depends(verify_jwt)):
+async def unsave_item(opportunity_id: int, user: dict = Depends(verify_jwt)):
     """Remove a saved item."""
     user_id = user.get("sub")
     try:
-        adb = AnalysisDB()
-        adb.unsave_item(user_id, opportunity_id)
+        await analysis_executor.run("unsave_item", user_id, opportunity_id)
         return {"status": "success"}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error removing saved item: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -457,7 +931,9 @@ async def create_order(request: dict, user: dict = Depends(verify_jwt)):
                 "plan": "pro"
             }
         }
-        order = razorpay_client.order.create(data=order_data)
+        # The first call imports the Razorpay SDK, which is slow; do that off the loop too
+        client = await run_in_threadpool(get_razorpay_client)
+        order = await run_in_threadpool(client.order.create, data=order_data)
         return order
     except Exception as e:
         logger.error(f"Error creating Razorpay order: {e}")
@@ -466,6 +942,8 @@ async def create_order(request: dict, user: dict = Depends(verify_jwt)):
 @app.post("/verify-payment")
 async def verify_payment(payload: PaymentVerification):
     """Verifies Razorpay payment signature and updates user plan."""
+    client = await run_in_threadpool(get_razorpay_client)
+    from razorpay.errors import SignatureVerificationError
     try:
         # Verify Signature
         params_dict = {
@@ -475,19 +953,20 @@ async def verify_payment(payload: PaymentVerification):
         }
         
         # Verify the signature
-        razorpay_client.utility.verify_payment_signature(params_dict)
+        await run_in_threadpool(client.utility.verify_payment_signature, params_dict)
         
         # If successful, update the user db
-        user_db = UserDB()
-        success = user_db.update_plan(payload.user_id, 'pro')
+        success = await users_executor.run("update_plan", payload.user_id, 'pro')
         
         if success:
             return {"status": "success", "message": "Plan updated to Pro"}
         else:
             raise HTTPException(status_code=500, detail="Failed to update user database")
             
-    except razorpay.errors.SignatureVerificationError:
+    except SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid Payment Signature")
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Payment verification failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -500,45 +979,47 @@ class CollectionPayload(BaseModel):
     boards: List[str]
 
 @app.get("/collections")
-def get_collections(user: dict = Depends(verify_jwt)):
+async def get_collections(user: dict = Depends(verify_jwt)):
     """Get collections for the authenticated user."""
     try:
-        adb = AnalysisDB()
-        return adb.get_collections(user.get("sub"))
+        return await analysis_executor.run("get_collections", user.get("sub"))
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error fetching collections: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/collections")
-def save_collection(payload: CollectionPayload, user: dict = Depends(verify_jwt)):
+async def save_collection(payload: CollectionPayload, user: dict = Depends(verify_jwt)):
     """Create or update a collection."""
     user_id = user.get("sub")
     plan_type = user.get("plan_type")
     
     # 1. Check Plan Limits (Free = Max 1)
     if plan_type != "pro":
-        adb = AnalysisDB()
-        current = adb.get_collections(user_id)
+        current = await analysis_executor.run("get_collections", user_id)
         # If updating existing (name exists), it's fine. If new, check limit.
         exists = any(c['name'] == payload.name for c in current)
         if not exists and len(current) >= 1:
             raise HTTPException(status_code=403, detail="Free Plan limited to 1 collection. Upgrade to Pro for unlimited.")
 
     try:
-        adb = AnalysisDB()
-        adb.save_collection(user_id, payload.name, payload.boards)
+        await analysis_executor.run("save_collection", user_id, payload.name, payload.boards)
         return {"status": "success", "name": payload.name}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error saving collection: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/collections/{name}")
-def delete_collection(name: str, user: dict = Depends(verify_jwt)):
+async def delete_collection(name: str, user: dict = Depends(verify_jwt)):
     """Delete a collection."""
     try:
-        adb = AnalysisDB()
-        adb.delete_collection(user.get("sub"), name)
+        await analysis_executor.run("delete_collection", user.get("sub"), name)
         return {"status": "success", "deleted": name}
+    except DBBusyError:
+        raise
     except Exception as e:
         logger.error(f"Error deleting collection: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the RootSearch databases and services.
+
+Run modules from the src/ directory, e.g. `python -m benchmarks.save_analysis`.
+"""
@@ -0,0 +1,137 @@
+"""
+Deterministic synthetic corpora for the benchmarks: a 4chan archive (threads and posts
+with real-looking comment HTML) and a matching set of analyzed opportunities.
+"""
+import random
+import time
+
+from db_manager import ArchiveDB
+from analysis_db import AnalysisDB
+from benchmarks.save_analysis import make_discoveries
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BOARDS = ["g", "biz", "sci", "v", "pol", "fit", "diy", "ck", "lit", "mu"]
+
+# Search terms with known frequencies in every corpus
+COMMON_TERM = "linux"       # ~1 in 8 posts
+RARE_TERM = "quokkaware"    # ~1 in 20k posts
+PREFIX_TERM = "subscri"     # matches subscription/subscribe/subscriber
+
+COMMON_WORDS = (
+    "the a to and is in it of for on with this that are be you just like what anon why how "
+    "software tool app price pay budget privacy cloud backup sync notes windows phone laptop "
+    "server code work job money cheap free open source update broken fix bloat ads tracking"
+).split()
+RARE_WORDS = ["subscription", "subscribe", "subscriber", "selfhosted", "homelab", "thinkpad", "ublock"]
+
+BASE_TIME = 1_700_000_000
+POSTS_PER_THREAD = (5, 300)
+
+
+def _sentence(rng, k):
+    words = []
+    for _ in range(k):
+        r = rng.random()
+        if r < 0.015:
+            words.append(COMMON_TERM)
+        elif r < 0.03:
+            words.append(rng.choice(RARE_WORDS))
+        else:
+            words.append(rng.choice(COMMON_WORDS))
+    return " ".join(words)
+
+
+def make_comment(rng, thread_post_ids):
+    """4chan-style comment HTML: quotelinks, greentext, <wbr> breaks and escaped entities."""
+    parts = []
+    if thread_post_ids and rng.random() < 0.6:
+        target = rng.choice(thread_post_ids)
+        parts.append(f'<a href="#p{target}" class="quotelink">&gt;&gt;{target}</a>')
+    for _ in range(rng.randint(1, 4)):
+        line = _sentence(rng, rng.randint(4, 30))
+        if rng.random() < 0.2:
+            line = f'<span class="quote">&gt;{line}</span>'
+        if rng.random() < 0.05:
+            line += " https://github.com/some<wbr>project/release"
+        parts.append(line.replace("'", "&#039;"))
+    if rng.random() < 1 / 20000:
+        parts.append(f"anyone tried {RARE_TERM} yet")
+    return "<br>".join(parts)
+
+
+def iter_threads(posts, boards=BOARDS, seed=0):
+    """Yields (board, thread_json) shaped like the 4chan thread API until `posts` posts are produced."""
+    rng = random.Random(seed)
+    post_id = 1
+    produced = 0
+    while produced < posts:
+        board = rng.choice(boards)
+        n = min(rng.randint(*POSTS_PER_THREAD), posts - produced)
+        created = BASE_TIME + post_id * 7
+        thread_posts = []
+        ids = []
+        for i in range(n):
+            p = {"no": post_id, "time": created + i * 30, "com": make_comment(rng, ids)}
+            if i == 0:
+                p["sub"] = _sentence(rng, 5).title()
+                p["replies"] = n - 1
+                p["images"] = n // 6
+                p["last_modified"] = created + (n - 1) * 30
+            thread_posts.append(p)
+            ids.append(post_id)
+            post_id += 1
+        produced += n
+        yield board, {"posts": thread_posts, "images": n // 6}
+
+
+def build_archive(path, posts, boards=BOARDS, seed=0, batch_threads=500):
+    """
+    Writes the synthetic archive through ArchiveDB's schema (so FTS triggers apply) in
+    large transactions; insert_thread's per-thread commit would make 10M posts take hours.
+    Returns the ArchiveDB.
+    """
+    db = ArchiveDB(str(path))
+    cursor = db.conn.cursor()
+    thread_rows, post_rows = [], []
+
+    def flush():
+        cursor.execute("BEGIN")
+        cursor.executemany(
+            "INSERT OR REPLACE INTO threads (thread_id, board, subject, last_modified, last_post_id, reply_count, image_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            thread_rows)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO posts (post_id, thread_id, board, timestamp, comment, is_op) VALUES (?, ?, ?, ?, ?, ?)",
+            post_rows)
+        db.conn.commit()
+        thread_rows.clear()
+        post_rows.clear()
+
+    started = time.perf_counter()
+    written = 0
+    for board, thread in iter_threads(posts, boards, seed):
+        op = thread["posts"][0]
+        thread_rows.append((op["no"], board, op.get("sub"), op["last_modified"], thread["posts"][-1]["no"], len(thread["posts"]) - 1, thread["images"]))
+        post_rows.extend((p["no"], op["no"], board, p["time"], p["com"], 1 if i == 0 else 0) for i, p in enumerate(thread["posts"]))
+        if len(thread_rows) >= batch_threads:
+            written += len(post_rows)
+            flush()
+            print(f"[*] Archive: {written:,}/{posts:,} posts ({time.perf_counter() - started:.0f}s)", end="\r")
+    written += len(post_rows)
+    flush()
+    db._bump_generation(cursor, "threads")
+    db.conn.commit()
+    print(f"[*] Archive: {written:,} posts in {time.perf_counter() - started:.1f}s" + " " * 10)
+    return db
+
+
+def build_analysis(path, opportunities, seed=0, batch=1000):
+    """Fills an AnalysisDB with `opportunities` synthetic discoveries across the corpus boards."""
+    db = AnalysisDB(str(path))
+    rng = random.Random(seed)
+    done = 0
+    while done < opportunities:
+        n = min(batch, opportunities - done)
+        boards = ",".join(rng.sample(BOARDS, rng.randint(1, 3)))
+        db.save_analysis_bulk(boards, {"opportunities": make_discoveries(n, seed=seed + done)})
+        done += n
+    return db
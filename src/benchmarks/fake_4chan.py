@@ -0,0 +1,235 @@
+"""
+Local stand-in for the 4chan read-only API, for exercising the scraper without touching
+production:
+
+    python -m benchmarks.fake_4chan --port 8404 --speedup 60
+    FOURCHAN_API_BASE=http://127.0.0.1:8404 FOURCHAN_REQUEST_DELAY=0 python board_scraper.py g
+
+Serves boards.json, <board>/catalog.json, <board>/threads.json and
+<board>/thread/<id>.json. Boards grow over simulated time: new threads are created at a
+steady rate and each thread gains replies until it hits the bump limit and is pruned
+(404). Last-Modified / If-Modified-Since are honoured with 304s, and 404s, 429s and
+latency can be injected.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import BOARDS, make_comment
+
+
+class FakeChan:
+    """Deterministic board state as a function of the simulated clock."""
+
+    def __init__(self, boards=BOARDS, live_threads=150, thread_interval=120, reply_interval=45,
+                 bump_limit=300, speedup=1.0, seed=0):
+        self.boards = list(boards)
+        self.live_threads = live_threads
+        self.thread_interval = thread_interval  # simulated seconds between new threads per board
+        self.reply_interval = reply_interval    # mean simulated seconds between replies per thread
+        self.bump_limit = bump_limit
+        self.speedup = speedup
+        self.seed = seed
+        # Start with full catalogs so the first sweep has work to do
+        self.epoch = 1_700_000_000
+        self._start_real = time.time()
+        self._offset = live_threads * thread_interval
+        self._lock = threading.Lock()
+
+    def now(self):
+        with self._lock:
+            return self.epoch + self._offset + (time.time() - self._start_real) * self.speedup
+
+    def advance(self, seconds):
+        """Moves the simulated clock forward (used by the throughput harness between sweeps)."""
+        with self._lock:
+            self._offset += seconds
+
+    def _board_base(self, board):
+        return (self.boards.index(board) + 1) * 10**9
+
+    def _thread_rate(self, board, index):
+        rng = random.Random(f"{self.seed}:{board}:{index}")
+        return self.reply_interval * rng.uniform(0.3, 3.0)
+
+    def thread_ids(self, board, now):
+        """Ids of threads alive at `now`, newest first (catalog order is by bump; close enough)."""
+        newest = int((now - self.epoch) // self.thread_interval)
+        oldest = max(0, newest - self.live_threads + 1)
+        base = self._board_base(board)
+        return [base + i * 1000 for i in range(newest, oldest - 1, -1)]
+
+    def thread_posts(self, board, thread_id, now, op_only=False):
+        """The thread's posts at `now` (just the OP with op_only), or None if it does not exist (yet) or was pruned."""
+        index = (thread_id - self._board_base(board)) // 1000
+        if index < 0 or (thread_id - self._board_base(board)) % 1000:
+            return None
+        created = self.epoch + index * self.thread_interval
+        if created > now or thread_id not in self.thread_ids(board, now):
+            return None
+        interval = self._thread_rate(board, index)
+        replies = min(self.bump_limit, int((now - created) // interval))
+        rng = random.Random(f"{self.seed}:{board}:{thread_id}")
+        posts, ids = [], []
+        for k in range(1 if op_only else replies + 1):
+            no = thread_id + k
+            post = {"no": no, "time": int(created + k * interval), "com": make_comment(rng, ids)}
+            if k == 0:
+                post.update(sub=f"Thread {index} on /{board}/", replies=replies, images=replies // 6,
+                            last_modified=int(created + replies * interval))
+            posts.append(post)
+            ids.append(no)
+        return posts
+
+
+class FaultConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_404=0.0, error_429=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_404 = error_404
+        self.error_429 = error_429
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self):
+        with self.lock:
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            r = self.rng.random()
+        if r < self.error_429:
+            return delay, 429
+        if r < self.error_429 + self.error_404:
+            return delay, 404
+        return delay, None
+
+
+class FakeChanServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, chan, faults):
+        super().__init__(address, _Handler)
+        self.chan = chan
+        self.faults = faults
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    def count(self, status):
+        with self.stats_lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, last_modified=None, extra=None):
+        self.server.count(status)
+        payload = json.dumps(body, separators=(",", ":")).encode() if body is not None else b""
+        self.send_response(status)
+        if last_modified:
+            self.send_header("Last-Modified", formatdate(last_modified, usegmt=True))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_modified(self, last_modified):
+        header = self.headers.get("If-Modified-Since")
+        if not header:
+            return False
+        try:
+            return int(last_modified) <= parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def do_GET(self):
+        chan = self.server.chan
+        delay, fault = self.server.faults.roll()
+        if delay:
+            time.sleep(delay)
+        if fault == 429:
+            return self._send(429, {"error": "rate limited"}, extra={"Retry-After": "1"})
+        if fault == 404:
+            return self._send(404)
+
+        now = chan.now()
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == ["boards.json"]:
+            return self._send(200, {"boards": [{"board": b, "title": f"/{b}/"} for b in chan.boards]})
+        if not parts or parts[0] not in chan.boards:
+            return self._send(404)
+        board = parts[0]
+
+        if parts[1:] in (["catalog.json"], ["threads.json"]):
+            threads = []
+            for tid in chan.thread_ids(board, now):
+                posts = chan.thread_posts(board, tid, now, op_only=True)
+                if posts:
+                    threads.append(posts[0])
+            last_modified = max((t["last_modified"] for t in threads), default=int(now))
+            if self._not_modified(last_modified):
+                return self._send(304, last_modified=last_modified)
+            pages = []
+            for i in range(0, len(threads), 15):
+                page_threads = threads[i:i + 15]
+                if parts[1] == "threads.json":
+                    page_threads = [{"no": t["no"], "last_modified": t["last_modified"], "replies": t["replies"]} for t in page_threads]
+                pages.append({"page": i // 15 + 1, "threads": page_threads})
+            return self._send(200, pages, last_modified=last_modified)
+
+        if len(parts) == 3 and parts[1] == "thread" and parts[2].endswith(".json"):
+            try:
+                thread_id = int(parts[2][:-5])
+            except ValueError:
+                return self._send(404)
+            posts = chan.thread_posts(board, thread_id, now)
+            if not posts:
+                return self._send(404)
+            last_modified = posts[0]["last_modified"]
+            if self._not_modified(last_modified):
+                return self._send(304, last_modified=last_modified)
+            return self._send(200, {"posts": posts}, last_modified=last_modified)
+
+        return self._send(404)
+
+
+def serve(chan, faults, host="127.0.0.1", port=0):
+    """Starts the fake API on a daemon thread; port=0 picks a free port (see server.url)."""
+    server = FakeChanServer((host, port), chan, faults)
+    threading.Thread(target=server.serve_forever, daemon=True, name="FakeChan").start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake 4chan API for scraper testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8404)
+    parser.add_argument("--boards", nargs="+", default=BOARDS)
+    parser.add_argument("--speedup", type=float, default=1.0, help="Simulated seconds per real second")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-404", type=float, default=0.0, help="Fraction of requests answered with 404")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = serve(FakeChan(args.boards, speedup=args.speedup),
+                   FaultConfig(args.latency_ms, args.jitter_ms, args.error_404, args.error_429),
+                   args.host, args.port)
+    print(f"[*] Fake 4chan API on {server.url} (boards: {', '.join(args.boards)})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,80 @@
+import argparse
+import gzip
+import json
+import random
+import time
+
+from responses import dumps, orjson
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:
+    jsonable_encoder = None
+
+WORDS = "anon software linux privacy subscription price budget thread board image reply tool cloud backup".split()
+
+
+def make_thread(posts, seed=0):
+    """Builds a thread shaped like ArchiveDB.get_thread, with 4chan-style HTML comments."""
+    rng = random.Random(seed)
+
+    def comment():
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))) for _ in range(rng.randint(1, 4))]
+        quote = f'<a href="#p{rng.randint(10**8, 10**9)}" class="quotelink">&gt;&gt;{rng.randint(10**8, 10**9)}</a><br>'
+        return quote + "<br>".join(f'<span class="quote">&gt;{l}</span>' if rng.random() < 0.2 else l for l in lines)
+
+    return {
+        "thread_id": 1, "board": "g", "subject": "Benchmark thread", "last_modified": 1700000000,
+        "reply_count": posts, "image_count": posts // 5,
+        "posts": [{
+            "post_id": i, "thread_id": 1, "board": "g", "timestamp": 1700000000 + i, "name": "Anonymous",
+            "comment": comment(), "has_file": i % 5 == 0, "replies": []
+        } for i in range(posts)]
+    }
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes, repeats=20):
+    encoders = [("json", lambda p: json.dumps(p).encode("utf-8"))]
+    if jsonable_encoder:
+        encoders.insert(0, ("jsonable_encoder+json", lambda p: json.dumps(jsonable_encoder(p)).encode("utf-8")))
+    encoders.append(("orjson" if orjson else "dumps (stdlib fallback)", dumps))
+
+    results = []
+    for size in sizes:
+        payload = make_thread(size)
+        body = dumps(payload)
+        for name, encode in encoders:
+            best = best_of(lambda: encode(payload), repeats)
+            results.append({"payload_posts": size, "encoder": name, "best_ms": round(best * 1000, 3)})
+            print(f"[*] {size:>5} posts | {name:>22} | {best * 1000:8.3f} ms")
+
+        for level in (1, 5, 9):
+            compressed = gzip.compress(body, compresslevel=level)
+            best = best_of(lambda: gzip.compress(body, compresslevel=level), repeats)
+            results.append({"payload_posts": size, "gzip_level": level, "raw_bytes": len(body),
+                            "gzip_bytes": len(compressed), "best_ms": round(best * 1000, 3)})
+            print(f"[*] {size:>5} posts | gzip level {level} | {len(body):>9} -> {len(compressed):>8} bytes "
+                  f"({len(compressed) / len(body):.1%}) | {best * 1000:8.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and gzip on thread-sized payloads.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 300, 1500])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", "-o", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
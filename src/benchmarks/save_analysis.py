@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from analysis_db import AnalysisDB
+
+INTENTS = ["Core Pains & Anger", "Money Talk", "Advice & Solution Requests", "Emerging Trends", "Ideas"]
+WORDS = "subscription software tool pay budget linux privacy ads price workflow sync backup notes app cloud".split()
+
+
+def make_discoveries(n, evidence_per_opp=3, seed=0):
+    """Builds a deterministic batch of discoveries shaped like the LLM output."""
+    rng = random.Random(seed)
+
+    def sentence(k=12):
+        return " ".join(rng.choice(WORDS) for _ in range(k))
+
+    return [{
+        "intent_category": rng.choice(INTENTS),
+        "category": rng.choice(["SaaS", "Hardware", "Finance", "Gaming"]),
+        "core_pain": sentence(),
+        "solution": sentence(),
+        "product_concept": sentence(8),
+        "emerging_trend": None,
+        "target_audience": sentence(4),
+        "market_score": rng.randint(1, 10),
+        "complexity": rng.choice(["Low", "Medium", "High"]),
+        "market_size": rng.choice(["Niche", "Mid-size", "Mass Market"]),
+        "product_domain": "FinTech",
+        "flair_type": "Rant",
+        "evidence": [
+            {"post_id": rng.randint(1, 10**9), "quote": sentence(20), "relevance": sentence(6)}
+            for _ in range(evidence_per_opp)
+        ]
+    } for _ in range(n)]
+
+
+def save_row_by_row(db, boards, analysis_json):
+    """The pre-bulk implementation: one execute per opportunity and per evidence row."""
+    cursor = db.conn.cursor()
+    for opp in analysis_json["opportunities"]:
+        cursor.execute('''
+            INSERT INTO opportunities (
+                source_boards, category, pain_points, emerging_trend,
+                solution, product_concept, target_audience,
+                market_score, complexity, market_size, product_domain,
+                intent_category, flair_type, core_pain
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (boards, opp.get("category"), json.dumps(opp.get("pain_points", [])), opp.get("emerging_trend"),
+              opp.get("solution"), opp.get("product_concept"), opp.get("target_audience"), opp.get("market_score"),
+              opp.get("complexity"), opp.get("market_size"), opp.get("product_domain"), opp.get("intent_category"),
+              opp.get("flair_type"), opp.get("core_pain")))
+        opportunity_id = cursor.lastrowid
+        for ev in opp.get("evidence", []):
+            cursor.execute("INSERT INTO evidence (opportunity_id, post_id, quote, relevance) VALUES (?, ?, ?, ?)",
+                           (opportunity_id, ev.get("post_id"), ev.get("quote"), ev.get("relevance")))
+    db.conn.commit()
+
+
+def run(batch_sizes, repeats=5):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in batch_sizes:
+            payload = {"opportunities": make_discoveries(size)}
+            for name, save in (("row_by_row", save_row_by_row), ("bulk", AnalysisDB.save_analysis_bulk)):
+                db = AnalysisDB(str(Path(tmp) / f"{name}_{size}.db"))
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    save(db, "g", payload)
+                    timings.append(time.perf_counter() - start)
+                db.conn.close()
+                best = min(timings)
+                results.append({"implementation": name, "batch_size": size, "best_s": round(best, 5),
+                                "rows_per_s": round(size / best)})
+                print(f"[*] {name:>10} | {size:>6} discoveries | best {best * 1000:8.2f} ms | {size / best:10.0f} opp/s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AnalysisDB.save_analysis with large discovery batches.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", "-o", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
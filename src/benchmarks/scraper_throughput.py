@@ -0,0 +1,89 @@
+"""
+Scraper throughput against the local fake 4chan API.
+
+    python -m benchmarks.scraper_throughput --boards g biz --cycles 3 --latency-ms 20 --error-429 0.01
+
+Each cycle scrapes every board once, then advances the fake clock by --cycle-seconds so
+the next sweep sees new threads and replies (and 304s for everything unchanged).
+"""
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import board_scraper
+from db_manager import ArchiveDB
+from analysis_db import AnalysisDB
+from benchmarks.fake_4chan import FakeChan, FaultConfig, serve
+
+
+def run(boards, cycles, cycle_seconds, faults, delay=0.0, live_threads=60, verbose=False):
+    # speedup=0 freezes the simulated clock between explicit advance() calls
+    chan = FakeChan(boards, live_threads=live_threads, speedup=0)
+    server = serve(chan, faults)
+    board_scraper.API_BASE = server.url
+    board_scraper.REQUEST_DELAY = delay
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ArchiveDB(str(Path(tmp) / "archive.db"))
+        stats_db = AnalysisDB(str(Path(tmp) / "analysis.db"))
+        for cycle in range(1, cycles + 1):
+            before = dict(server.stats)
+            summaries = []
+            start = time.perf_counter()
+            out = io.StringIO()
+            with contextlib.redirect_stdout(None if verbose else out):
+                for board in board_scraper.get_all_boards():
+                    summaries.append(board_scraper.scrape_board(board, db=db, stats_db=stats_db))
+            elapsed = time.perf_counter() - start
+
+            statuses = {str(k): v - before.get(k, 0) for k, v in server.stats.items() if v - before.get(k, 0)}
+            posts = sum(s["posts"] for s in summaries)
+            result = {
+                "cycle": cycle,
+                "seconds": round(elapsed, 3),
+                "requests": sum(statuses.values()),
+                "responses": statuses,
+                "threads_new": sum(s["new"] for s in summaries),
+                "threads_updated": sum(s["updated"] for s in summaries),
+                "threads_skipped": sum(s["skipped"] for s in summaries),
+                "threads_failed": sum(s["failed"] for s in summaries),
+                "posts": posts,
+                "posts_per_s": round(posts / elapsed) if elapsed else 0,
+                "requests_per_s": round(sum(statuses.values()) / elapsed, 1) if elapsed else 0
+            }
+            results.append(result)
+            print(f"[*] Cycle {cycle}: {elapsed:7.2f}s | {result['requests']:>5} requests {statuses} | "
+                  f"{posts:>7} posts ({result['posts_per_s']}/s) | new {result['threads_new']}, "
+                  f"updated {result['threads_updated']}, skipped {result['threads_skipped']}, failed {result['threads_failed']}")
+            chan.advance(cycle_seconds)
+        db.conn.close()
+        stats_db.conn.close()
+    server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure scraper throughput against a fake 4chan API.")
+    parser.add_argument("--boards", nargs="+", default=["g", "biz", "sci"])
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--cycle-seconds", type=float, default=600, help="Simulated time between sweeps")
+    parser.add_argument("--live-threads", type=int, default=60, help="Threads alive per board")
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay between thread requests (production uses 1.1s)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-404", type=float, default=0.0)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true", help="Show the scraper's own output")
+    parser.add_argument("--output", "-o", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    faults = FaultConfig(args.latency_ms, args.jitter_ms, args.error_404, args.error_429)
+    results = run(args.boards, args.cycles, args.cycle_seconds, faults, args.delay, args.live_threads, args.verbose)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,95 @@
+"""
+Import-time budget for the API and CLIs.
+
+    python -m benchmarks.startup                       # import app, default budget
+    python -m benchmarks.startup analysis --budget-ms 300 --runs 7
+
+Each run imports the module in a fresh interpreter with -X importtime and reports the
+median wall time plus the slowest imports. Exits non-zero when the median exceeds the
+budget (STARTUP_BUDGET_MS), so it can gate CI or a pre-deploy check;
+tests/test_startup.py runs the same check for `app` under the test suite.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+
+def _parse_importtime(stderr):
+    """(cumulative_us, module) for each top-level line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(cumulative), name.rstrip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def _direct_imports(rows, module):
+    """
+    The modules `module` imported itself. importtime prints children before their parent,
+    indented two spaces per level, so collect lines until the top-level `module` line.
+    """
+    group = []
+    for us, name in rows:
+        if not name.startswith("  "):
+            if name.strip() == module:
+                return [(c_us, c_name.strip()) for c_us, c_name in group if not c_name.startswith("   ")]
+            group = []
+        else:
+            group.append((us, name[2:]))
+    return []
+
+
+def measure_import(module):
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=SRC_DIR, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no output"
+        raise RuntimeError(f"import {module} failed: {last}")
+    return elapsed, _parse_importtime(proc.stderr)
+
+
+def run(module, runs, budget_ms, top):
+    timings, imports = [], None
+    for _ in range(runs):
+        elapsed, imports = measure_import(module)
+        timings.append(elapsed)
+    median = statistics.median(timings)
+
+    print(f"[*] import {module}: median {median:.0f} ms over {runs} runs (min {min(timings):.0f}, max {max(timings):.0f}; budget {budget_ms:.0f} ms)")
+    print(f"[*] Slowest direct imports of {module} (cumulative):")
+    for us, name in sorted(_direct_imports(imports, module), reverse=True)[:top]:
+        print(f"    {us / 1000:>8.1f} ms  {name}")
+    return median <= budget_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if importing a module exceeds a startup-time budget.")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to list")
+    args = parser.parse_args()
+
+    try:
+        ok = run(args.module, args.runs, args.budget_ms, args.top)
+    except RuntimeError as e:
+        print(f"[!] {e}")
+        sys.exit(2)
+    if not ok:
+        print("[!] Startup budget exceeded")
+        sys.exit(1)
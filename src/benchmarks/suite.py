@@ -0,0 +1,195 @@
+"""
+End-to-end database benchmarks on a synthetic corpus.
+
+    python -m benchmarks.suite --scale 10k -o results.json
+    python -m benchmarks.suite --scale 1m --data-dir /tmp/corpora --compare results.json
+
+Corpora are deterministic for a given scale and seed; with --data-dir they are built once
+and reused, so 1M/10M runs only pay the build cost the first time.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from db_manager import ArchiveDB
+from analysis_db import AnalysisDB
+from tracking import run_sweep
+from benchmarks.corpus import (SCALES, BOARDS, BASE_TIME, COMMON_TERM, RARE_TERM, PREFIX_TERM,
+                               build_archive, build_analysis, iter_threads)
+
+
+def measure(name, fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    result = {
+        "name": name,
+        "runs": repeats,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3)
+    }
+    print(f"[*] {name:<40} median {result['median_ms']:>10.3f} ms | p95 {result['p95_ms']:>10.3f} ms")
+    return result
+
+
+def open_corpus(data_dir, scale, seed):
+    posts = SCALES[scale]
+    archive_path = Path(data_dir) / f"archive_{scale}_s{seed}.db"
+    analysis_path = Path(data_dir) / f"analysis_{scale}_s{seed}.db"
+    reused = archive_path.exists() and analysis_path.exists()
+    if reused:
+        print(f"[*] Reusing corpus in {data_dir}")
+        return ArchiveDB(str(archive_path)), AnalysisDB(str(analysis_path)), reused, 0.0
+
+    for p in (archive_path, analysis_path):
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(p) + suffix).unlink(missing_ok=True)
+    start = time.perf_counter()
+    archive = build_archive(archive_path, posts, seed=seed)
+    analysis = build_analysis(analysis_path, max(100, posts // 100), seed=seed)
+    return archive, analysis, reused, time.perf_counter() - start
+
+
+def bench_live_search(archive, repeats):
+    results = []
+    for label, term in (("common", COMMON_TERM), ("rare", RARE_TERM), ("prefix", PREFIX_TERM)):
+        results.append(measure(f"live_search.{label}", lambda: archive.search(term, limit=50), repeats))
+    results.append(measure("live_search.common_page_20", lambda: archive.search(COMMON_TERM, limit=50, offset=950), repeats))
+    results.append(measure("live_search.common_since", lambda: archive.search(COMMON_TERM, limit=100, min_timestamp=BASE_TIME), repeats))
+    return results
+
+
+def bench_get_thread(archive, repeats, seed):
+    rows = archive.conn.execute("SELECT board, thread_id FROM threads ORDER BY thread_id").fetchall()
+    rng = random.Random(seed)
+    sample = [rng.choice(rows) for _ in range(repeats)]
+    it = iter(sample)
+    return [measure("get_thread", lambda: archive.get_thread(*next(it)), len(sample))]
+
+
+def bench_analyzed(analysis, repeats):
+    return [
+        measure("analyzed.search_text", lambda: analysis.search_opportunities(query="subscription", limit=20), repeats),
+        measure("analyzed.search_filters", lambda: analysis.search_opportunities(boards="g,biz", score_min=5, complexity="Low", limit=20, sort_by="score"), repeats),
+        measure("analyzed.aggregations", lambda: analysis.get_search_aggregations(query="software"), repeats),
+        measure("analyzed.latest", lambda: analysis.get_latest_analysis(boards="g"), repeats),
+    ]
+
+
+def bench_sweep(archive, analysis, users=20):
+    cursor = analysis.conn.cursor()
+    cursor.execute("DELETE FROM tracked_keywords WHERE user_id LIKE 'bench-%'")
+    cursor.execute("DELETE FROM keyword_matches WHERE user_id LIKE 'bench-%'")
+    cursor.execute("DELETE FROM keyword_counters WHERE user_id LIKE 'bench-%'")
+    analysis.conn.commit()
+    since = archive.conn.execute("SELECT MAX(timestamp) FROM posts").fetchone()[0] - 86400 * 30
+    for i in range(users):
+        for term in (COMMON_TERM, PREFIX_TERM, RARE_TERM):
+            analysis.add_tracked_keyword(f"bench-{i}", term)
+    cursor.execute("UPDATE tracked_keywords SET added_at = ? WHERE user_id LIKE 'bench-%'", (since,))
+    analysis.conn.commit()
+
+    sweep = lambda: run_sweep(adb=analysis, archive_db=archive)
+    results = [measure("run_sweep.first", sweep, 1), measure("run_sweep.steady", sweep, 3)]
+
+    cursor.execute("DELETE FROM tracked_keywords WHERE user_id LIKE 'bench-%'")
+    cursor.execute("DELETE FROM keyword_matches WHERE user_id LIKE 'bench-%'")
+    cursor.execute("DELETE FROM keyword_counters WHERE user_id LIKE 'bench-%'")
+    analysis.conn.commit()
+    return results
+
+
+def bench_insert_thread(archive, threads=100, seed=0):
+    """Times ArchiveDB.insert_thread for new threads, then removes them to keep the corpus pristine."""
+    first_id = (archive.conn.execute("SELECT MAX(post_id) FROM posts").fetchone()[0] or 0) + 1
+    batch = []
+    for board, thread in iter_threads(threads * 150, seed=seed + 1):
+        for p in thread["posts"]:
+            p["no"] += first_id
+        batch.append((board, thread))
+        if len(batch) == threads:
+            break
+
+    it = iter(batch)
+    result = measure("insert_thread", lambda: archive.insert_thread(*next(it)), len(batch))
+    posts = sum(len(t["posts"]) for _, t in batch)
+    result["posts_per_s"] = round(posts / (result["median_ms"] * len(batch) / 1000))
+
+    cursor = archive.conn.cursor()
+    cursor.execute('''
+        INSERT INTO posts_search(posts_search, rowid, post_id, comment)
+        SELECT 'delete', post_id, post_id, comment FROM posts WHERE post_id >= ?
+    ''', (first_id,))
+    cursor.execute("DELETE FROM posts WHERE post_id >= ?", (first_id,))
+    cursor.execute("DELETE FROM threads WHERE thread_id >= ?", (first_id,))
+    archive.conn.commit()
+    return [result]
+
+
+def compare(results, baseline_path):
+    baseline = {r["name"]: r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"\n[*] Compared with {baseline_path}:")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old and old["median_ms"]:
+            change = (r["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+            flag = "  <-- slower" if change > 10 else ""
+            print(f"    {r['name']:<40} {old['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms ({change:+.1f}%){flag}")
+
+
+def run(scale, data_dir, repeats=20, seed=0):
+    archive, analysis, reused, build_s = open_corpus(data_dir, scale, seed)
+    results = []
+    results += bench_live_search(archive, repeats)
+    results += bench_get_thread(archive, repeats * 5, seed)
+    results += bench_analyzed(analysis, repeats)
+    results += bench_sweep(archive, analysis)
+    results += bench_insert_thread(archive, seed=seed)
+    return {
+        "scale": scale,
+        "posts": SCALES[scale],
+        "seed": seed,
+        "corpus_reused": reused,
+        "build_s": round(build_s, 2),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ArchiveDB / AnalysisDB on a synthetic corpus.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--data-dir", help="Directory to build/reuse corpora in (default: a temporary directory)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write results JSON here")
+    parser.add_argument("--compare", help="Previous results JSON to compare medians against")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+        report = run(args.scale, args.data_dir, args.repeats, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run(args.scale, tmp, args.repeats, args.seed)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[*] Results written to {args.output}")
+    if args.compare:
+        compare(report["results"], args.compare)
@@ -1,25 +1,69 @@
+import os
 import requests
 import time
 import json
 import argparse
 from pathlib import Path
 from db_manager import ArchiveDB
+from metrics import REGISTRY
+
+# 4chan API endpoint and delay between requests (the API rules ask for at least 1s).
+# Both can be overridden, e.g. to point the scraper at benchmarks.fake_4chan.
+API_BASE = os.getenv("FOURCHAN_API_BASE", "https://a.4cdn.org").rstrip("/")
+REQUEST_DELAY = float(os.getenv("FOURCHAN_REQUEST_DELAY", "1.1"))
+REQUEST_TIMEOUT = float(os.getenv("FOURCHAN_REQUEST_TIMEOUT", "15"))
+
+SCRAPER_REQUESTS = REGISTRY.counter("rootsearch_scraper_requests_total", "4chan API requests by board, kind (catalog/thread) and HTTP status.", ("board", "kind", "status"))
+SCRAPER_REQUEST_SECONDS = REGISTRY.histogram("rootsearch_scraper_request_seconds", "4chan API request latency.", ("kind",))
+SCRAPER_POSTS = REGISTRY.counter("rootsearch_scraper_posts_ingested_total", "New posts written to the archive.", ("board",))
+SCRAPER_THREADS = REGISTRY.counter("rootsearch_scraper_threads_total", "Threads processed by outcome (new/updated/skipped).", ("board", "outcome"))
+
+def _get(board, kind, url, headers):
+    """requests.get with latency and status metrics; status is 'error' when no response arrived."""
+    with SCRAPER_REQUEST_SECONDS.time(kind=kind):
+        try:
+            response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except Exception:
+            SCRAPER_REQUESTS.inc(board=board, kind=kind, status="error")
+            raise
+    SCRAPER_REQUESTS.inc(board=board, kind=kind, status=response.status_code)
+    return response
 
 def get_all_boards():
     """Fetches the list of all board codes from 4chan."""
     try:
-        r = requests.get("https://a.4cdn.org/boards.json")
+        r = requests.get(f"{API_BASE}/boards.json", timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
         return [b['board'] for b in r.json()['boards']]
     except Exception as e:
         print(f"[!] Failed to retrieve boards list: {e}")
         return []
 
-def scrape_board(board_code, db=None):
+def _record_stats(board_code, catalog, stats_db):
+    """Board stats straight from the catalog we just fetched; None means the catalog was unchanged (304)."""
+    # Imported here: board_stats imports this module for API_BASE
+    from board_stats import catalog_stats, record_board_stats
+    if stats_db is None:
+        from analysis_db import AnalysisDB
+        stats_db = AnalysisDB()
+    try:
+        if catalog is None:
+            stats_db.touch_board_cache(board_code)
+        else:
+            record_board_stats(stats_db, board_code, catalog_stats(board_code, catalog))
+    except Exception as e:
+        # Stats are a side product; never fail the scrape over them
+        print(f"[!] Could not record stats for /{board_code}/: {e}")
+
+def scrape_board(board_code, db=None, stats_db=None):
     """
     Scrapes all threads from a given board, performs incremental updates, and saves to database.
+    Board stats are recorded from the same catalog fetch (into stats_db, an AnalysisDB).
+    Returns a summary dict: catalog status ("ok", "not_modified" or "error"), thread counts
+    (new/updated/skipped/failed), requests issued and new posts ingested.
     """
-    base_url = "https://a.4cdn.org"
+    base_url = API_BASE
+    summary = {"board": board_code, "catalog": "ok", "new": 0, "updated": 0, "skipped": 0, "failed": 0, "requests": 0, "posts": 0}
     if db is None:
         db = ArchiveDB() # Initializes/Connects to data/4chan_archive.db
 
@@ -31,16 +75,21 @@ def scrape_board(board_code, db=None):
     headers = {"If-Modified-Since": last_mod} if last_mod else {}
     
     try:
-        response = requests.get(f"{base_url}/{board_code}/catalog.json", headers=headers)
+        summary["requests"] += 1
+        response = _get(board_code, "catalog", f"{base_url}/{board_code}/catalog.json", headers)
         if response.status_code == 304:
             print(f"[*] /{board_code}/ catalog unchanged. Skipping.")
-            return
+            summary["catalog"] = "not_modified"
+            _record_stats(board_code, None, stats_db)
+            return summary
         response.raise_for_status()
         catalog = response.json()
         db.set_sync_header(resource_id, response.headers.get("Last-Modified"))
     except Exception as e:
         print(f"[!] Error fetching catalog: {e}")
-        return
+        summary["catalog"] = "error"
+        return summary
+    _record_stats(board_code, catalog, stats_db)
 
     # 2. Extract all thread info from all pages
     catalog_threads = []
@@ -50,7 +99,7 @@ def scrape_board(board_code, db=None):
 
     if not catalog_threads:
         print(f"[!] No threads found on board /{board_code}/.")
-        return
+        return summary
 
     print(f"[*] Total threads in catalog: {len(catalog_threads)}. Checking against database...")
 
@@ -76,7 +125,7 @@ def scrape_board(board_code, db=None):
                 continue
         
         # 4. Respect 4chan API limit
-        time.sleep(1.1) 
+        time.sleep(REQUEST_DELAY)
         print(f"[{index}/{len(catalog_threads)}] Fetching/Updating thread {thread_id}...", end="\r")
         
         try:
@@ -87,7 +136,8 @@ def scrape_board(board_code, db=None):
             t_last_mod = db.get_sync_header(thread_resource)
             t_headers = {"If-Modified-Since": t_last_mod} if t_last_mod else {}
             
-            thread_res = requests.get(thread_url, headers=t_headers)
+            summary["requests"] += 1
+            thread_res = _get(board_code, "thread", thread_url, t_headers)
             
             if thread_res.status_code == 304:
                 skipped_count += 1
@@ -95,7 +145,9 @@ def scrape_board(board_code, db=None):
             
             if thread_res.status_code == 200:
                 thread_data = thread_res.json()
-                db.insert_thread(board_code, thread_data)
+                new_posts = db.insert_thread(board_code, thread_data)
+                SCRAPER_POSTS.inc(new_posts, board=board_code)
+                summary["posts"] += new_posts
                 db.set_sync_header(thread_resource, thread_res.headers.get("Last-Modified"))
                 
                 if thread_id in existing_stats:
@@ -104,11 +156,19 @@ def scrape_board(board_code, db=None):
                     new_count += 1
             elif thread_res.status_code == 404:
                 continue
+            else:
+                summary["failed"] += 1
         except Exception as e:
+            summary["failed"] += 1
             print(f"\n[!] Error processing {thread_id}: {e}")
 
+    SCRAPER_THREADS.inc(new_count, board=board_code, outcome="new")
+    SCRAPER_THREADS.inc(updated_count, board=board_code, outcome="updated")
+    SCRAPER_THREADS.inc(skipped_count, board=board_code, outcome="skipped")
     print(f"\n[*] Summary: {new_count} new, {updated_count} updated, {skipped_count} skipped.")
     print(f"[*] All data successfully archived in SQLite database: data/4chan_archive.db")
+    summary.update(new=new_count, updated=updated_count, skipped=skipped_count)
+    return summary
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="4chan Full Board Scraper")
@@ -118,10 +178,12 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     shared_db = ArchiveDB()
+    from analysis_db import AnalysisDB
+    shared_stats_db = AnalysisDB()
 
     def run_scrape():
         if args.board:
-            scrape_board(args.board, db=shared_db)
+            scrape_board(args.board, db=shared_db, stats_db=shared_stats_db)
         else:
             print("[*] No board specified. Starting full archival of ALL boards...")
             boards = get_all_boards()
@@ -130,8 +192,8 @@ if __name__ == "__main__":
             else:
                 for i, board in enumerate(boards, 1):
                     print(f"\n--- Board {i}/{len(boards)} ---")
-                    scrape_board(board, db=shared_db)
-                    time.sleep(1.1)
+                    scrape_board(board, db=shared_db, stats_db=shared_stats_db)
+                    time.sleep(REQUEST_DELAY)
                 print("\n[*] Full sweep complete.")
 
     if args.continuous:
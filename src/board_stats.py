@@ -1,28 +1,25 @@
+import os
 import requests
 import json
 from collections import Counter
 import re
 import time
 from pathlib import Path
+import board_scraper
 
-def get_board_stats(board_code, quiet=False):
+# Seconds before a catalog request is abandoned; the API must never hang on 4chan
+REQUEST_TIMEOUT = 10
+# The scraper records a history sample on every catalog it fetches. Raw samples and hourly
+# rollups are pruned after these many seconds (0 = keep); daily rollups are kept.
+SAMPLE_RETENTION = int(os.getenv("BOARD_HISTORY_SAMPLE_RETENTION", str(2 * 86400)))
+HOURLY_RETENTION = int(os.getenv("BOARD_HISTORY_HOURLY_RETENTION", str(35 * 86400)))
+# Growth is reported against the board's reply count this long ago
+GROWTH_WINDOW = 24 * 3600
+
+def catalog_stats(board_code, catalog):
     """
-    Fetches the catalog for a board and calculates high-level statistics.
+    Calculates high-level statistics from a board's catalog.json pages.
     """
-    base_url = "https://a.4cdn.org"
-    
-    if not quiet:
-        print(f"[*] Fetching live catalog for /{board_code}/...")
-    
-    try:
-        response = requests.get(f"{base_url}/{board_code}/catalog.json")
-        response.raise_for_status()
-        catalog = response.json()
-    except Exception as e:
-        if not quiet:
-            print(f"[!] Error: Could not fetch catalog for /{board_code}/. {e}")
-        return None
-
     total_threads = 0
     total_replies = 0
     total_images = 0
@@ -66,6 +63,27 @@ def get_board_stats(board_code, quiet=False):
         'top_threads': top_threads,
         'trending_keywords': [w for w, c in common_words]
     }
+    return stats
+
+def get_board_stats(board_code, quiet=False, timeout=REQUEST_TIMEOUT):
+    """
+    Fetches the catalog for a board and calculates high-level statistics.
+    """
+    base_url = board_scraper.API_BASE
+    
+    if not quiet:
+        print(f"[*] Fetching live catalog for /{board_code}/...")
+    
+    try:
+        response = requests.get(f"{base_url}/{board_code}/catalog.json", timeout=timeout)
+        response.raise_for_status()
+        catalog = response.json()
+    except Exception as e:
+        if not quiet:
+            print(f"[!] Error: Could not fetch catalog for /{board_code}/. {e}")
+        return None
+
+    stats = catalog_stats(board_code, catalog)
 
     if not quiet:
         # Output Stats
@@ -88,13 +106,45 @@ def get_board_stats(board_code, quiet=False):
     
     return stats
 
+def record_board_stats(db, board, stats):
+    """
+    Adds reply growth versus GROWTH_WINDOW ago, records the sample in the board's
+    activity history and stores the full stats in the cache served by the API. Returns stats.
+    """
+    now = int(time.time())
+    prev_replies = db.get_board_replies_before(board, now - GROWTH_WINDOW)
+    growth = 0.0
+
+    if prev_replies:
+        # Calculate growth based on replies (activity)
+        # growth = ((current - previous) / previous) * 100
+        diff = stats['replies'] - prev_replies
+        growth = (diff / prev_replies) * 100
+
+    stats['growth'] = round(growth, 2)
+    db.record_board_sample(board, stats['threads'], stats['replies'], stats['images'], ts=now,
+                           sample_retention=SAMPLE_RETENTION, hourly_retention=HOURLY_RETENTION)
+    db.save_board_cache(board, stats)
+    return stats
+
+def refresh_board_stats(board, db=None, timeout=REQUEST_TIMEOUT):
+    """Fetches live stats for one board and records them. Returns the stats or None."""
+    stats = get_board_stats(board, quiet=True, timeout=timeout)
+    if not stats:
+        return None
+    if db is None:
+        from analysis_db import AnalysisDB
+        db = AnalysisDB()
+    return record_board_stats(db, board, stats)
+
 def get_all_boards_stats():
     """
-    Fetches stats for ALL boards and saves them to a single JSON file.
+    Fetches stats for ALL boards and saves them to the DB cache. Manual backfill only:
+    the scraper keeps stats current for every board it archives.
     """
     print("[*] Retrieving board list from 4chan...")
     try:
-        r = requests.get("https://a.4cdn.org/boards.json")
+        r = requests.get(f"{board_scraper.API_BASE}/boards.json", timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
         boards_list = [b['board'] for b in r.json()['boards']]
     except Exception as e:
@@ -111,29 +161,11 @@ def get_all_boards_stats():
     
     for i, board in enumerate(boards_list, 1):
         # API Rule: 1 request per second
-        time.sleep(1.1)
+        time.sleep(board_scraper.REQUEST_DELAY)
         print(f"[{i}/{total}] Processing /{board}/...", end="\r")
         
-        stats = get_board_stats(board, quiet=True)
+        stats = refresh_board_stats(board, db=db)
         if stats:
-            # 1. Get History for Growth Calc
-            prev = db.get_previous_stats(board)
-            growth = 0.0
-            
-            if prev and prev['replies'] > 0:
-                # Calculate growth based on replies (activity)
-                # growth = ((current - previous) / previous) * 100
-                diff = stats['replies'] - prev['replies']
-                growth = (diff / prev['replies']) * 100
-                
-            stats['growth'] = round(growth, 2)
-            
-            # 2. Save Current to History
-            db.save_board_stats(board, stats['threads'], stats['replies'])
-            
-            # 3. Save Full Stats to DB Cache (for API)
-            db.save_board_cache(board, stats)
-            
             all_stats[board] = stats
     
     # We no longer write to local JSON file to avoid Docker volume issues
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REGISTRY
+
+POOL_WAIT_SECONDS = REGISTRY.histogram("rootsearch_db_pool_wait_seconds", "Time calls spend queued for a database worker thread.", ("db",))
+POOL_CALLS = REGISTRY.counter("rootsearch_db_pool_calls_total", "Calls finished on a database pool, by outcome (ok, error).", ("db", "outcome"))
+POOL_REJECTED = REGISTRY.counter("rootsearch_db_pool_rejected_total", "Calls rejected because the database pool was full.", ("db",))
+
+
+class DBBusyError(Exception):
+    """Raised when a database executor already has max_pending calls queued or running."""
+
+    def __init__(self, name):
+        super().__init__(f"Database '{name}' is busy")
+        self.name = name
+
+
+class DBExecutor:
+    """
+    Runs blocking calls against one database on its own fixed-size thread pool, so slow
+    queries on one database cannot starve requests to another (or the event loop).
+
+    Each worker thread lazily opens and keeps its own DB instance: sqlite3 connections are
+    bound to the thread that created them, and reusing them avoids a connect per request.
+    """
+
+    def __init__(self, name, factory, max_workers=4, max_pending=64):
+        self.name = name
+        self.factory = factory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{name}")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("db_executor")
+
+        # Metrics
+        self.pending = 0  # queued + running
+        self.active = 0
+        self.completed = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self.factory()
+        return db
+
+    def _call(self, fn, args, kwargs, submitted):
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._lock:
+            self.active += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        POOL_WAIT_SECONDS.observe(wait, db=self.name)
+
+        failed = False
+        try:
+            db = self._get_db()
+            if isinstance(fn, str):
+                return getattr(db, fn)(*args, **kwargs)
+            return fn(db, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.errors += failed
+                self.total_run += time.perf_counter() - started
+            POOL_CALLS.inc(db=self.name, outcome="error" if failed else "ok")
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Awaits fn on this database's pool. fn is either a method name of the DB instance
+        or a callable taking the DB instance as its first argument.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                POOL_REJECTED.inc(db=self.name)
+                raise DBBusyError(self.name)
+            self.pending += 1
+
+        try:
+            future = self._pool.submit(self._call, fn, args, kwargs, time.perf_counter())
+        except BaseException:
+            self._done()
+            raise
+        # Released when the work itself finishes (or is cancelled before starting), not when
+        # the caller stops waiting: a cancelled request's query still occupies the pool
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self):
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "active": self.active,
+                "queued": self.pending - self.active,
+                "completed": self.completed,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / done * 1000, 2),
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_run_ms": round(self.total_run / done * 1000, 2)
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
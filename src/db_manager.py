@@ -1,5 +1,8 @@
 import sqlite3
 from pathlib import Path
+from metrics import timed_query
+import query_log
+import migrations
 
 class ArchiveDB:
     def __init__(self, db_path="data/4chan_archive.db"):
@@ -7,94 +10,48 @@ class ArchiveDB:
         project_root = Path(__file__).parent.parent
         self.db_path = project_root / db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), timeout=20)
+        self.conn = query_log.connect(str(self.db_path), timeout=20)
         # Enable WAL mode for better concurrency
         self.conn.execute("PRAGMA journal_mode=WAL")
-        self._create_tables()
-
-    def _create_tables(self):
-        cursor = self.conn.cursor()
-        
-        # 1. Threads table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS threads (
-                thread_id INTEGER PRIMARY KEY,
-                board TEXT,
-                subject TEXT,
-                last_modified INTEGER,
-                reply_count INTEGER,
-                image_count INTEGER
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_threads_board_mod ON threads (board, last_modified DESC)')
-
-        # 2. Posts table (normalized)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                post_id INTEGER PRIMARY KEY,
-                thread_id INTEGER,
-                board TEXT,
-                timestamp INTEGER,
-                comment TEXT,
-                is_op INTEGER,
-                FOREIGN KEY(thread_id) REFERENCES threads(thread_id)
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_posts_thread_board ON posts (board, thread_id)')
-
-        # 3. Request Tracking for API compliance (If-Modified-Since)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS api_sync (
-                resource_id TEXT PRIMARY KEY, -- e.g. "catalog_sci" or "thread_12345"
-                last_modified_header TEXT
-            )
-        ''')
-
-        # 4. Full Text Search table for comments
-        cursor.execute('''
-            CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5(
-                post_id UNINDEXED, 
-                comment,
-                content='posts',
-                content_rowid='post_id'
-            )
-        ''')
-        
-        # Triggers to keep FTS index updated automatically
-        cursor.execute('''
-            CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
-                INSERT INTO posts_search(rowid, post_id, comment) VALUES (new.post_id, new.post_id, new.comment);
-            END;
-        ''')
-
-        self.conn.commit()
+        migrations.migrate(self.conn, "archive", migrations.ARCHIVE_MIGRATIONS)
 
+    @timed_query("archive")
     def insert_thread(self, board, thread_data):
+        """Upserts a thread and its posts. Returns the number of posts that were new."""
         cursor = self.conn.cursor()
         posts = thread_data.get('posts', [])
-        if not posts: return
+        if not posts: return 0
 
         op = posts[0]
         thread_id = op['no']
         
-        # Insert/Update Thread
+        # Insert/Update Thread. last_modified is the newest post time and moves forward
+        # (by at least a second) whenever the thread changes, so it can back If-Modified-Since.
         cursor.execute('''
-            INSERT INTO threads (thread_id, board, subject, last_modified, reply_count, image_count)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO threads (thread_id, board, subject, last_modified, last_post_id, reply_count, image_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(thread_id) DO UPDATE SET
-                last_modified=excluded.last_modified,
+                last_modified = CASE
+                    WHEN excluded.last_post_id <= COALESCE(last_post_id, 0)
+                         AND reply_count IS excluded.reply_count
+                         AND image_count IS excluded.image_count THEN last_modified
+                    ELSE MAX(excluded.last_modified, COALESCE(last_modified, 0) + 1)
+                END,
+                last_post_id = MAX(COALESCE(last_post_id, 0), excluded.last_post_id),
                 reply_count=excluded.reply_count,
                 image_count=excluded.image_count
         ''', (
             thread_id, 
             board, 
             op.get('sub'), 
-            op.get('last_modified', op.get('time')),
+            max(p['time'] for p in posts),
+            max(p['no'] for p in posts),
             len(posts) - 1,
             thread_data.get('images', 0)
         ))
 
         # Insert Posts
+        new_posts = 0
         for i, post in enumerate(posts):
             cursor.execute('''
                 INSERT OR IGNORE INTO posts (post_id, thread_id, board, timestamp, comment, is_op)
@@ -107,16 +64,42 @@ class ArchiveDB:
                 post.get('com', ''),
                 1 if i == 0 else 0
             ))
-        
+            new_posts += cursor.rowcount
+
+        self._bump_generation(cursor, "threads")
         self.conn.commit()
+        return new_posts
+
+    def _bump_generation(self, cursor, name):
+        cursor.execute('''
+            INSERT INTO data_generations (name, generation, updated_at) VALUES (?, 1, strftime('%s', 'now'))
+            ON CONFLICT(name) DO UPDATE SET generation = generation + 1, updated_at = excluded.updated_at
+        ''', (name,))
 
+    def get_generation(self, name="threads"):
+        """Returns (generation, updated_at unix time) for a table, (0, None) if never written."""
+        cursor = self.conn.cursor()
+        row = cursor.execute("SELECT generation, updated_at FROM data_generations WHERE name = ?", (name,)).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    @timed_query("archive")
+    def get_thread_version(self, board, thread_id):
+        """Returns (last_modified, last_post_id, reply_count, image_count) for a thread via its primary key, or None."""
+        cursor = self.conn.cursor()
+        return cursor.execute("SELECT last_modified, last_post_id, reply_count, image_count FROM threads WHERE thread_id = ? AND board = ?", (thread_id, board)).fetchone()
+
+    @staticmethod
+    def _prefix_query(keyword):
+        # Support prefix matching for live search too
+        words = keyword.strip().split()
+        return " ".join([f"{w}*" if not w.endswith('*') else w for w in words])
+
+    @timed_query("archive")
     def search(self, keyword, limit=50, offset=0, min_timestamp=None):
         cursor = self.conn.cursor()
         
         # 1. Get Total Count
-        # Support prefix matching for live search too
-        words = keyword.strip().split()
-        fts_keyword = " ".join([f"{w}*" if not w.endswith('*') else w for w in words])
+        fts_keyword = self._prefix_query(keyword)
         
         where_clause = "WHERE ps.comment MATCH ?"
         params = [fts_keyword]
@@ -218,7 +201,45 @@ class ArchiveDB:
             
         return results, total_count, aggregations
 
-    def get_thread(self, board, thread_id):
+    @timed_query("archive")
+    def search_batch(self, keyword, before_post_id=None, limit=1000, min_timestamp=None):
+        """
+        One page of live search results, newest first, for streaming exports. Pages are
+        keyed on the last post_id returned (posts_search rowid == post_id), so unlike
+        OFFSET paging each page costs the same however deep the export goes.
+        """
+        cursor = self.conn.cursor()
+        conditions = ["ps.comment MATCH ?"]
+        params = [self._prefix_query(keyword)]
+        if before_post_id is not None:
+            conditions.append("ps.rowid < ?")
+            params.append(before_post_id)
+        if min_timestamp:
+            conditions.append("p.timestamp > ?")
+            params.append(min_timestamp)
+        params.append(limit)
+
+        rows = cursor.execute(f"""
+            SELECT p.board, p.thread_id, p.post_id, p.comment, p.timestamp, t.subject
+            FROM posts_search ps
+            JOIN posts p ON ps.rowid = p.post_id
+            JOIN threads t ON p.thread_id = t.thread_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY ps.rowid DESC
+            LIMIT ?
+        """, params).fetchall()
+        return [{
+            "board": r[0],
+            "thread_id": r[1],
+            "post_id": r[2],
+            "comment": r[3],
+            "timestamp": r[4],
+            "subject": r[5]
+        } for r in rows]
+
+    @timed_query("archive")
+    def get_thread(self, board, thread_id, after_post_id=None, limit=None):
+        """Thread info plus its posts in post order; after_post_id/limit page through (or extend) long threads."""
         cursor = self.conn.cursor()
         
         # Get Thread Info
@@ -235,13 +256,18 @@ class ArchiveDB:
             "image_count": row[5]
         }
         
-        # Get Posts
-        cursor.execute("""
+        # Get Posts (served entirely from idx_posts_thread_cover)
+        query = """
             SELECT post_id, timestamp, comment, is_op 
             FROM posts 
-            WHERE board = ? AND thread_id = ? 
+            WHERE board = ? AND thread_id = ? AND post_id > ?
             ORDER BY post_id ASC
-        """, (board, thread_id))
+        """
+        params = [board, thread_id, after_post_id or 0]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        cursor.execute(query, params)
         
         posts = []
         for r in cursor.fetchall():
@@ -257,6 +283,7 @@ class ArchiveDB:
             "posts": posts
         }
 
+    @timed_query("archive")
     def get_all_stored_boards(self):
         cursor = self.conn.cursor()
         rows = cursor.execute("SELECT DISTINCT board FROM threads").fetchall()
@@ -273,6 +300,7 @@ class ArchiveDB:
         cursor.execute("INSERT OR REPLACE INTO api_sync (resource_id, last_modified_header) VALUES (?, ?)", (resource_id, header_value))
         self.conn.commit()
 
+    @timed_query("archive")
     def get_global_stats(self):
         cursor = self.conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM posts")
@@ -4,6 +4,7 @@ import json
 import re
 import html
 from pathlib import Path
+from prescore import rank_threads
 
 def clean_text(text):
     """
@@ -29,7 +30,12 @@ def clean_text(text):
     
     return text
 
-def ingest_data(boards, limit=15, min_replies=30, output_file=None):
+def ingest_data(boards, limit=15, min_replies=30, output_file=None, prescore=False, pool_size=None):
+    """
+    Loads recent threads with their cleaned posts for analysis.
+    With prescore=True, a larger pool of recent threads (pool_size, default 10x limit) is
+    ranked by local signal score and only the top `limit` threads with any signal are kept.
+    """
     if isinstance(boards, str):
         boards = [boards]
     
@@ -48,16 +54,27 @@ def ingest_data(boards, limit=15, min_replies=30, output_file=None):
     overall_result = []
 
     for board in boards:
-        # 1. Fetch LATEST threads (sorted by last activity)
-        query = "SELECT thread_id, subject, last_modified, reply_count FROM threads WHERE board = ? AND reply_count >= ? ORDER BY last_modified DESC"
-        params = [board, min_replies]
-        
-        if limit:
-            query += " LIMIT ?"
-            params.append(limit)
-        
-        cursor.execute(query, params)
-        threads = cursor.fetchall()
+        if prescore:
+            # 1. Rank a pool of recent threads by local signal and keep the best ones
+            pool = pool_size or (limit or 15) * 10
+            ranked = rank_threads(conn, board, min_replies=min_replies, pool_size=pool, top_n=limit)
+            print(f"[*] Pre-scored up to {pool} threads in /{board}/; forwarding {len(ranked)} with signal")
+            ranked_ids = [t[0] for t in ranked]
+            placeholders = ",".join(["?"] * len(ranked_ids))
+            cursor.execute(f"SELECT thread_id, subject, last_modified, reply_count FROM threads WHERE thread_id IN ({placeholders})", ranked_ids)
+            by_id = {t[0]: t for t in cursor.fetchall()}
+            threads = [by_id[t_id] for t_id in ranked_ids if t_id in by_id]
+        else:
+            # 1. Fetch LATEST threads (sorted by last activity)
+            query = "SELECT thread_id, subject, last_modified, reply_count FROM threads WHERE board = ? AND reply_count >= ? ORDER BY last_modified DESC"
+            params = [board, min_replies]
+
+            if limit:
+                query += " LIMIT ?"
+                params.append(limit)
+
+            cursor.execute(query, params)
+            threads = cursor.fetchall()
 
         if not threads:
             print(f"[*] No threads found in the database for /{board}/.")
@@ -119,6 +136,8 @@ if __name__ == "__main__":
     parser.add_argument("--limit", type=int, default=20, help="Limit number of threads to retrieve (default: 20, or 10 if multiple boards)")
     parser.add_argument("--min-replies", type=int, default=30, help="Minimum number of replies required for a thread (default: 30)")
     parser.add_argument("--output", "-o", help="File path to save the JSON output")
-    
+    parser.add_argument("--prescore", action="store_true", help="Keep only the threads with the highest local signal score")
+    parser.add_argument("--pool-size", type=int, help="Recent threads to pre-score per board (default: 10x limit)")
+
     args = parser.parse_args()
-    ingest_data(args.boards, args.limit, args.min_replies, args.output)
+    ingest_data(args.boards, args.limit, args.min_replies, args.output, prescore=args.prescore, pool_size=args.pool_size)
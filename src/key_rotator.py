@@ -1,21 +1,70 @@
 import os
+import math
+import time
+import hashlib
 import logging
-from analysis_db import AnalysisDB
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Ensure environment variables are loaded
-# This is usually done in app.py or analysis.py, but good to have here as well 
+# This is usually done in app.py or analysis.py, but good to have here as well
 # to support standalone usage of the rotator.
 env_path = Path(__file__).parent.parent / ".env.local"
 load_dotenv(dotenv_path=env_path)
 
+USAGE_PREFIX = "api_usage:"
+COOLDOWN_PREFIX = "api_cooldown:"
+# Longest a key is benched after a 429, whatever the backoff or Retry-After says
+MAX_COOLDOWN = 6 * 3600
+
+
+def _parse_retry_after(value, now):
+    """
+    Seconds to wait from a Retry-After value (delta-seconds or HTTP-date), capped at
+    MAX_COOLDOWN so a skewed clock or bogus far-future date cannot bench a key for good.
+    None if absent, negative or unparseable.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        seconds = float(value)
+        if not math.isfinite(seconds) or seconds < 0:
+            return None
+        return min(seconds, MAX_COOLDOWN)
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        # A date already past means "retry now"
+        return min(max(0.0, when.timestamp() - now), MAX_COOLDOWN)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
 class KeyRotator:
-    def __init__(self, rotation_threshold=40):
+    """
+    Picks the OpenRouter key with the most remaining daily quota, skipping keys
+    that were recently rate limited.
+
+    Usage counters live in memory and are flushed to the `settings` table as
+    atomic deltas, so several worker processes can share one database without
+    losing increments. Each flush also pulls the other processes' totals back in.
+    """
+
+    def __init__(self, daily_quota=None, flush_interval=30, flush_every=10, base_cooldown=60):
         self._logger = logging.getLogger("key_rotator")
-        self.rotation_threshold = rotation_threshold
-        self.db = AnalysisDB()
-        
+        self.daily_quota = daily_quota or int(os.getenv("OPENROUTER_DAILY_QUOTA", "50"))
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.base_cooldown = base_cooldown
+        self._lock = threading.Lock()
+        self._db = None
+
         # Load keys from environment
         self.keys = [
             os.getenv("OPENROUTER_API_KEY_1"),
@@ -24,42 +73,142 @@ class KeyRotator:
         ]
         # Filter out empty keys
         self.keys = [k for k in self.keys if k and k != "<OPENROUTER_API_KEY>"]
-        
+        # Stable, non-secret identifiers used as settings keys
+        self._ids = {k: hashlib.sha256(k.encode()).hexdigest()[:12] for k in self.keys}
+
+        self._day = None
+        self._shared_usage = {}   # key -> count persisted by all processes today
+        self._pending = {}        # key -> increments not yet flushed
+        self._cooldown_until = {} # key -> unix time the key may be used again
+        self._recent_429s = {}    # key -> [unix times of recent 429 responses]
+        self._last_sync = 0.0
+        self._last_key = None
+
         if not self.keys:
             self._logger.error("No valid OpenRouter API keys found in .env.local")
 
+    @property
+    def db(self):
+        # Opened on first use so importing this module never touches SQLite
+        if self._db is None:
+            from analysis_db import AnalysisDB
+            self._db = AnalysisDB()
+        return self._db
+
     def get_active_key(self):
-        """Returns the current API key based on the global request count."""
+        """Returns the key with the most remaining quota that is not cooling down."""
         if not self.keys:
             return None
-            
-        count_str = self.db.get_setting("api_request_count", "0")
-        try:
-            count = int(count_str)
-        except ValueError:
-            count = 0
-            
-        # Select key index based on floor division of count / threshold
-        # then modulo the number of available keys
-        key_index = (count // self.rotation_threshold) % len(self.keys)
-        
-        active_key = self.keys[key_index]
-        # Mask the key in logs for security
-        masked_key = active_key[:8] + "..." + active_key[-4:] if active_key else "None"
-        self._logger.info(f"Using API Key #{key_index + 1} (Request Count: {count})")
-        return active_key
-
-    def increment_count(self):
-        """Increments the global API request count."""
-        count_str = self.db.get_setting("api_request_count", "0")
+
+        with self._lock:
+            self._maybe_sync()
+            now = time.time()
+            available = [k for k in self.keys if self._cooldown_until.get(k, 0) <= now]
+
+            if available:
+                # Most remaining quota first, then fewest recent 429s, then env order
+                active_key = max(available, key=lambda k: (
+                    self._remaining(k),
+                    -len(self._recent_429s.get(k, [])),
+                    -self.keys.index(k)
+                ))
+            else:
+                # Everything is throttled: use whichever key frees up soonest
+                active_key = min(self.keys, key=lambda k: self._cooldown_until.get(k, 0))
+                self._logger.warning("All API keys are rate limited; using the one that recovers first")
+
+            if self._remaining(active_key) <= 0:
+                self._logger.warning("All API keys have exhausted their daily quota of %d", self.daily_quota)
+
+            self._last_key = active_key
+            key_index = self.keys.index(active_key)
+            self._logger.info(f"Using API Key #{key_index + 1} (Used today: {self._used(active_key)}/{self.daily_quota})")
+            return active_key
+
+    def increment_count(self, key=None):
+        """Records one request against key (defaults to the last key handed out)."""
+        key = key or self._last_key
+        if key not in self._ids:
+            return
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if sum(self._pending.values()) >= self.flush_every:
+                self._sync()
+
+    def report_rate_limited(self, key=None, retry_after=None):
+        """
+        Marks key as throttled after a 429. Without a Retry-After hint the cooldown
+        doubles with each 429 seen in the last hour.
+        """
+        key = key or self._last_key
+        if key not in self._ids:
+            return
+        with self._lock:
+            now = time.time()
+            recent = [t for t in self._recent_429s.get(key, []) if now - t < 3600]
+            recent.append(now)
+            self._recent_429s[key] = recent
+
+            cooldown = _parse_retry_after(retry_after, now)
+            if cooldown is None:
+                cooldown = min(self.base_cooldown * (2 ** (len(recent) - 1)), MAX_COOLDOWN)
+            until = max(self._cooldown_until.get(key, 0), now + cooldown)
+            self._cooldown_until[key] = until
+            self._logger.warning(f"API Key #{self.keys.index(key) + 1} rate limited; cooling down for {int(cooldown)}s")
+
+            try:
+                self.db.update_setting(COOLDOWN_PREFIX + self._ids[key], int(until))
+            except Exception as e:
+                self._logger.error(f"Failed to persist key cooldown: {e}")
+
+    def flush(self):
+        """Persists pending counters immediately (e.g. at the end of a run)."""
+        with self._lock:
+            self._sync()
+
+    def _used(self, key):
+        return self._shared_usage.get(key, 0) + self._pending.get(key, 0)
+
+    def _remaining(self, key):
+        return self.daily_quota - self._used(key)
+
+    def _usage_setting(self, key):
+        return f"{USAGE_PREFIX}{self._day}:{self._ids[key]}"
+
+    def _maybe_sync(self):
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if today != self._day or time.time() - self._last_sync >= self.flush_interval:
+            self._sync()
+
+    def _sync(self):
+        """Flush pending deltas and reload totals written by every process."""
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        rolled_over = today != self._day
         try:
-            count = int(count_str)
-        except ValueError:
-            count = 0
-            
-        new_count = count + 1
-        self.db.update_setting("api_request_count", new_count)
-        self._logger.info(f"API request count incremented to {new_count}")
-
-# Singleton instance
+            if self._pending:
+                # Pending requests belong to the day they were made on
+                self._day = self._day or today
+                deltas = {self._usage_setting(k): n for k, n in self._pending.items() if n}
+                deltas["api_request_count"] = sum(self._pending.values())
+                self.db.increment_settings(deltas)
+                self._pending = {}
+
+            if rolled_over:
+                # Quotas reset daily; drop counters from previous days
+                stale = [k for k in self.db.get_settings_by_prefix(USAGE_PREFIX) if not k.startswith(f"{USAGE_PREFIX}{today}:")]
+                self.db.delete_settings(stale)
+                self._day = today
+
+            usage = self.db.get_settings_by_prefix(f"{USAGE_PREFIX}{today}:")
+            cooldowns = self.db.get_settings_by_prefix(COOLDOWN_PREFIX)
+            for k in self.keys:
+                self._shared_usage[k] = int(usage.get(self._usage_setting(k), 0))
+                shared_until = int(cooldowns.get(COOLDOWN_PREFIX + self._ids[k], 0))
+                self._cooldown_until[k] = max(self._cooldown_until.get(k, 0), shared_until)
+        except Exception as e:
+            # Keep counting in memory; the deltas are retried on the next sync
+            self._logger.error(f"Failed to sync API key usage: {e}")
+        self._last_sync = time.time()
+
+# Singleton instance (lazy: no database access until a key is requested)
 rotator = KeyRotator()
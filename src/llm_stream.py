@@ -0,0 +1,103 @@
+import json
+import re
+
+# Start of the discoveries array; tolerates markdown fences and the legacy key
+ARRAY_START = re.compile(r'"(?:discoveries|opportunities)"\s*:\s*\[')
+
+
+def iter_sse_content(response, usage=None):
+    """
+    Yields the text deltas of a streamed OpenRouter chat completion.
+    `response` must be a requests response opened with stream=True. If `usage` is a dict
+    it is filled with the token usage the stream reports in its final chunk (requested
+    with stream_options.include_usage).
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        # Blank lines separate events; ':' lines are keep-alive comments
+        if not line or line.startswith(":"):
+            continue
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        if "error" in event:
+            raise RuntimeError(f"Stream error: {event['error']}")
+        if usage is not None and event.get("usage"):
+            usage.update(event["usage"])
+        choices = event.get("choices") or []
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class DiscoveryStreamParser:
+    """
+    Incrementally extracts discovery objects from a partially received JSON document
+    of the form {"discoveries": [{...}, {...}]}.
+
+    feed() returns every object that was completed by the new text, so callers can
+    persist discoveries while the model is still generating. Objects that fail to
+    parse are skipped; everything before a truncation point survives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.finished = False
+        self.skipped = 0
+        self._pos = None        # scan position once the array has been found
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = None
+
+    def feed(self, text):
+        self.buffer += text
+        if self.finished:
+            return []
+
+        if self._pos is None:
+            match = ARRAY_START.search(self.buffer)
+            if not match:
+                return []
+            self._pos = match.end()
+
+        completed = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._obj_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the discoveries array itself
+                    self.finished = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start is not None:
+                    try:
+                        completed.append(json.loads(buf[self._obj_start:i + 1]))
+                    except json.JSONDecodeError:
+                        self.skipped += 1
+                    self._obj_start = None
+            i += 1
+        self._pos = i
+        return completed
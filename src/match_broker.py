@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+
+from metrics import REGISTRY
+
+STREAM_EVENTS = REGISTRY.counter("rootsearch_keyword_stream_events_total", "Keyword match stream events: matches published, deliveries to subscribers, resyncs sent.", ("event",))
+
+# Queued in place of a subscriber's backlog when it falls behind; the client refetches instead
+RESYNC = object()
+
+
+class Subscription:
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+
+class MatchBroker:
+    """
+    In-process pub/sub for new keyword matches, keyed by user.
+
+    publish() may be called from any thread (the tracking sweep runs on the monitor
+    thread); delivery happens on the event loop. Each subscriber has a bounded queue:
+    a client that stops reading has its backlog replaced by a single RESYNC marker,
+    so a slow connection costs at most max_queue events of memory and never blocks
+    the sweep or other subscribers.
+    """
+
+    def __init__(self, max_queue=100, max_per_user=5):
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self._subs = {}  # user_id -> set of Subscription (event loop only)
+        self._loop = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("match_broker")
+
+        # Metrics
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    def bind(self, loop):
+        self._loop = loop
+
+    def has_subscribers(self):
+        return bool(self._subs)
+
+    def at_limit(self, user_id):
+        """True if the user already has max_per_user open streams."""
+        return len(self._subs.get(user_id, ())) >= self.max_per_user
+
+    def subscribe(self, user_id):
+        """Returns a Subscription, or None if the user already has max_per_user streams."""
+        subs = self._subs.setdefault(user_id, set())
+        if len(subs) >= self.max_per_user:
+            return None
+        sub = Subscription(user_id, self.max_queue)
+        subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        subs = self._subs.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.user_id]
+
+    def publish(self, user_id, match):
+        """Thread-safe; a no-op until bound to the API's event loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._lock:
+            self.published += 1
+        STREAM_EVENTS.inc(event="published")
+        loop.call_soon_threadsafe(self._deliver, user_id, match)
+
+    def _deliver(self, user_id, match):
+        for sub in self._subs.get(user_id, ()):
+            try:
+                sub.queue.put_nowait(match)
+                self.delivered += 1
+                STREAM_EVENTS.inc(event="delivered")
+            except asyncio.QueueFull:
+                # Drop the stale backlog; one RESYNC tells the client to refetch /keywords
+                sub.dropped += sub.queue.qsize()
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait(RESYNC)
+                self.resyncs += 1
+                STREAM_EVENTS.inc(event="resync")
+                self._logger.info(f"Subscriber for {user_id} fell behind; sent resync")
+
+    def stats(self):
+        return {
+            "users": len(self._subs),
+            "streams": sum(len(s) for s in self._subs.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs
+        }
@@ -0,0 +1,546 @@
+"""
+Ordered schema migrations keyed by SQLite's PRAGMA user_version.
+
+Each database has a list of steps; step N (1-based) takes the schema from version N-1 to
+N and is applied exactly once, in its own IMMEDIATE transaction together with the
+user_version bump, so concurrent workers starting up never apply a step twice. Once a
+database is current, opening it costs a single header read.
+
+Version 1 of each list is the baseline: it creates the schema as it stood before
+versioning and fills in anything older databases were missing, so unversioned (v0)
+databases converge with new ones. Append new steps; never edit or reorder shipped ones.
+"""
+import logging
+
+from simhash import simhash, bands, opportunity_text, SIGNATURE_FIELDS
+
+BATCH_SIZE = 5000
+
+_logger = logging.getLogger("migrations")
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, name, steps):
+    """Applies the pending steps for `name` to conn. Returns the resulting schema version."""
+    target = len(steps)
+    version = current_version(conn)
+    if version > target:
+        _logger.warning(f"{name} database is at schema v{version}, newer than this code (v{target})")
+    if version >= target:
+        return version
+
+    conn.commit()
+    cursor = conn.cursor()
+    while True:
+        # Re-read under the write lock: another process may have migrated while we waited
+        cursor.execute("BEGIN IMMEDIATE")
+        version = current_version(conn)
+        if version >= target:
+            conn.commit()
+            return version
+        step = steps[version]
+        print(f"[*] Migrating {name} database to v{version + 1}: {step.__doc__.strip().splitlines()[0]}")
+        try:
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _logger.exception(f"Migration of {name} database to v{version + 1} failed")
+            raise
+
+
+def _columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _in_batches(cursor, label, table, work, key="id"):
+    """
+    Calls work(cursor, after, upto) over consecutive key ranges of `table` holding
+    BATCH_SIZE rows each, printing progress. Keeps statements (and their memory) small on
+    large tables; the whole step still commits atomically.
+    """
+    total = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    done, after = 0, 0
+    while True:
+        upto, count = cursor.execute(
+            f"SELECT MAX({key}), COUNT(*) FROM (SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?)",
+            (after, BATCH_SIZE)).fetchone()
+        if not count:
+            break
+        work(cursor, after, upto)
+        done += count
+        after = upto
+        print(f"[*] {label}: {done:,}/{total:,} rows", end="\r")
+    print(f"[*] {label}: {done:,}/{total:,} rows" + " " * 10)
+
+
+# --- Archive (data/4chan_archive.db) ---
+
+def _archive_baseline(cursor):
+    """Threads, posts, sync state, FTS index and generation counters"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS threads (
+            thread_id INTEGER PRIMARY KEY,
+            board TEXT,
+            subject TEXT,
+            last_modified INTEGER,
+            reply_count INTEGER,
+            image_count INTEGER
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_threads_board_mod ON threads (board, last_modified DESC)')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            post_id INTEGER PRIMARY KEY,
+            thread_id INTEGER,
+            board TEXT,
+            timestamp INTEGER,
+            comment TEXT,
+            is_op INTEGER,
+            FOREIGN KEY(thread_id) REFERENCES threads(thread_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_posts_thread_board ON posts (board, thread_id)')
+
+    # Request tracking for API compliance (If-Modified-Since)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_sync (
+            resource_id TEXT PRIMARY KEY, -- e.g. "catalog_sci" or "thread_12345"
+            last_modified_header TEXT
+        )
+    ''')
+
+    # Full text search over comments, kept in sync by posts_ai
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5(
+            post_id UNINDEXED,
+            comment,
+            content='posts',
+            content_rowid='post_id'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_search(rowid, post_id, comment) VALUES (new.post_id, new.post_id, new.comment);
+        END;
+    ''')
+
+    # Per-table change counters used for HTTP ETags
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER,
+            updated_at INTEGER
+        )
+    ''')
+
+
+def _archive_thread_cover_index(cursor):
+    """Covering index for reading a thread's posts in order"""
+    # Replies to one thread are scraped over hours, so its rows are scattered across the
+    # posts table; with the comment in the index a thread read is one contiguous range scan.
+    # (board, thread_id) lookups elsewhere use the same prefix.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_posts_thread_cover ON posts (board, thread_id, post_id, timestamp, is_op, comment)')
+    cursor.execute('DROP INDEX IF EXISTS idx_posts_thread_board')
+
+
+def _archive_thread_last_post(cursor):
+    """Track each thread's newest archived post for conditional GETs"""
+    # last_modified used to hold the OP's creation time, which never moves; derive it
+    # (and last_post_id) from the archived posts instead.
+    if "last_post_id" not in _columns(cursor, "threads"):
+        cursor.execute("ALTER TABLE threads ADD COLUMN last_post_id INTEGER")
+
+    def work(cur, after, upto):
+        cur.execute('''
+            UPDATE threads SET
+                last_post_id = (SELECT MAX(p.post_id) FROM posts p WHERE p.board = threads.board AND p.thread_id = threads.thread_id),
+                last_modified = MAX(COALESCE(last_modified, 0), COALESCE(
+                    (SELECT MAX(p.timestamp) FROM posts p WHERE p.board = threads.board AND p.thread_id = threads.thread_id), 0))
+            WHERE thread_id > ? AND thread_id <= ?
+        ''', (after, upto))
+
+    _in_batches(cursor, "Backfilling thread last posts", "threads", work, key="thread_id")
+
+
+ARCHIVE_MIGRATIONS = [
+    _archive_baseline,
+    _archive_thread_cover_index,
+    _archive_thread_last_post,
+]
+
+
+# --- Analysis (data/opportunities.db) ---
+
+OPPORTUNITY_COLUMNS = [
+    ("market_score", "INTEGER"),
+    ("complexity", "TEXT"),
+    ("market_size", "TEXT"),
+    ("product_domain", "TEXT"),
+    ("intent_category", "TEXT"),
+    ("flair_type", "TEXT"),
+    ("core_pain", "TEXT"),
+    ("recurrence_count", "INTEGER DEFAULT 1"),
+    ("last_seen", "DATETIME")
+]
+
+FTS_COLUMNS = ["core_pain", "product_concept", "solution", "emerging_trend", "category",
+               "intent_category", "product_domain", "target_audience", "source_boards"]
+
+
+def _analysis_baseline(cursor):
+    """Opportunities, evidence, keyword tracking, board stats, settings and collections"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS opportunities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_boards TEXT,
+            category TEXT,
+            pain_points TEXT, -- JSON array
+            emerging_trend TEXT,
+            solution TEXT,
+            product_concept TEXT,
+            target_audience TEXT,
+            market_score INTEGER,
+            complexity TEXT,
+            market_size TEXT,
+            product_domain TEXT,
+            intent_category TEXT,
+            flair_type TEXT,
+            core_pain TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            recurrence_count INTEGER DEFAULT 1, -- times this discovery was re-found
+            last_seen DATETIME
+        )
+    ''')
+    # Databases created before these columns existed
+    existing = _columns(cursor, "opportunities")
+    for col_name, col_type in OPPORTUNITY_COLUMNS:
+        if col_name not in existing:
+            cursor.execute(f"ALTER TABLE opportunities ADD COLUMN {col_name} {col_type}")
+            print(f"[*] Added {col_name} to opportunities")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_score ON opportunities(market_score)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_intent ON opportunities(intent_category)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON opportunities(timestamp)")
+
+    # Near-duplicate detection: SimHash per opportunity plus a banded lookup index
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS opportunity_signatures (
+            opportunity_id INTEGER PRIMARY KEY,
+            simhash INTEGER,
+            intent_category TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS opportunity_sig_bands (
+            band INTEGER,
+            value INTEGER,
+            opportunity_id INTEGER,
+            PRIMARY KEY (band, value, opportunity_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Evidence linked to posts
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS evidence (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            opportunity_id INTEGER,
+            post_id INTEGER,
+            quote TEXT,
+            relevance TEXT,
+            FOREIGN KEY(opportunity_id) REFERENCES opportunities(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tracked_keywords (
+            user_id TEXT,
+            keyword TEXT,
+            added_at INTEGER,
+            label TEXT,
+            PRIMARY KEY (user_id, keyword)
+        )
+    ''')
+    if "label" not in _columns(cursor, "tracked_keywords"):
+        cursor.execute("ALTER TABLE tracked_keywords ADD COLUMN label TEXT")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS keyword_matches (
+            user_id TEXT,
+            post_id INTEGER,
+            keyword TEXT,
+            board TEXT,
+            thread_id INTEGER,
+            comment TEXT,
+            found_at INTEGER,
+            is_read INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, post_id, keyword)
+        )
+    ''')
+    if "is_read" not in _columns(cursor, "keyword_matches"):
+        cursor.execute("ALTER TABLE keyword_matches ADD COLUMN is_read INTEGER DEFAULT 0")
+    # Newest-first paging (UI and NDJSON export) without sorting the whole match set
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_keyword_matches_found ON keyword_matches (user_id, keyword, found_at DESC, post_id DESC)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_stats_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            board_code TEXT,
+            threads INTEGER,
+            replies INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Global settings (API key rotation, etc.)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+    # Early builds had a global collections table without user_id
+    existing = _columns(cursor, "collections")
+    if existing and "user_id" not in existing:
+        cursor.execute("DROP TABLE collections")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS collections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            name TEXT,
+            boards TEXT, -- Comma separated board codes
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, name)
+        )
+    ''')
+
+    # Board stats cache (replaces the local JSON file)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_stats_cache (
+            board_code TEXT PRIMARY KEY,
+            data JSON,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _analysis_opportunities_fts(cursor):
+    """FTS5 index over opportunities, with sync triggers"""
+    if set(FTS_COLUMNS) <= _columns(cursor, "opportunities_fts"):
+        return
+
+    cursor.execute("DROP TABLE IF EXISTS opportunities_fts")
+    for trigger in ("opportunities_ai", "opportunities_ad", "opportunities_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    cols_sql = ", ".join(FTS_COLUMNS)
+    new_sql = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_sql = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE opportunities_fts USING fts5(
+            {cols_sql},
+            content='opportunities',
+            content_rowid='id'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER opportunities_ai AFTER INSERT ON opportunities BEGIN
+          INSERT INTO opportunities_fts(rowid, {cols_sql}) VALUES (new.id, {new_sql});
+        END;
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER opportunities_ad AFTER DELETE ON opportunities BEGIN
+          INSERT INTO opportunities_fts(opportunities_fts, rowid, {cols_sql}) VALUES ('delete', old.id, {old_sql});
+        END;
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER opportunities_au AFTER UPDATE ON opportunities BEGIN
+          INSERT INTO opportunities_fts(opportunities_fts, rowid, {cols_sql}) VALUES ('delete', old.id, {old_sql});
+          INSERT INTO opportunities_fts(rowid, {cols_sql}) VALUES (new.id, {new_sql});
+        END;
+    ''')
+
+    def backfill(cursor, after, upto):
+        cursor.execute(f'''
+            INSERT INTO opportunities_fts(rowid, {cols_sql})
+            SELECT id, {cols_sql} FROM opportunities WHERE id > ? AND id <= ?
+        ''', (after, upto))
+
+    _in_batches(cursor, "Backfilling opportunities_fts", "opportunities", backfill)
+
+
+def _analysis_signatures(cursor):
+    """SimHash signatures for opportunities saved before near-duplicate detection"""
+    def backfill(cursor, after, upto):
+        rows = cursor.execute(f'''
+            SELECT id, intent_category, {", ".join(SIGNATURE_FIELDS)}
+            FROM opportunities
+            WHERE id > ? AND id <= ? AND id NOT IN (SELECT opportunity_id FROM opportunity_signatures)
+        ''', (after, upto)).fetchall()
+        sig_rows, band_rows = [], []
+        for row in rows:
+            sig = simhash(opportunity_text(dict(zip(SIGNATURE_FIELDS, row[2:]))))
+            sig_rows.append((row[0], sig, row[1]))
+            band_rows.extend((band, value, row[0]) for band, value in bands(sig))
+        cursor.executemany("INSERT OR REPLACE INTO opportunity_signatures (opportunity_id, simhash, intent_category) VALUES (?, ?, ?)", sig_rows)
+        cursor.executemany("INSERT OR IGNORE INTO opportunity_sig_bands (band, value, opportunity_id) VALUES (?, ?, ?)", band_rows)
+
+    _in_batches(cursor, "Backfilling opportunity signatures", "opportunities", backfill)
+
+
+def _analysis_shared_post_matches(cursor):
+    """Shared post_matches rows; keyword_matches keeps only ids and read state"""
+    # One row per matched post, however many users/keywords matched it
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_matches (
+            post_id INTEGER PRIMARY KEY,
+            board TEXT,
+            thread_id INTEGER,
+            snippet TEXT, -- cleaned comment text shown in match lists
+            first_seen INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE keyword_matches_slim (
+            user_id TEXT,
+            post_id INTEGER,
+            keyword TEXT,
+            found_at INTEGER,
+            is_read INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, post_id, keyword)
+        )
+    ''')
+
+    def copy(cursor, after, upto):
+        cursor.execute('''
+            INSERT OR IGNORE INTO post_matches (post_id, board, thread_id, snippet, first_seen)
+            SELECT post_id, board, thread_id, comment, found_at FROM keyword_matches
+            WHERE rowid > ? AND rowid <= ? ORDER BY rowid
+        ''', (after, upto))
+        # Same rowids, so SSE tailers following keyword_matches' rowid keep their place
+        cursor.execute('''
+            INSERT INTO keyword_matches_slim (rowid, user_id, post_id, keyword, found_at, is_read)
+            SELECT rowid, user_id, post_id, keyword, found_at, is_read FROM keyword_matches
+            WHERE rowid > ? AND rowid <= ?
+        ''', (after, upto))
+
+    _in_batches(cursor, "Deduplicating keyword matches", "keyword_matches", copy, key="rowid")
+    cursor.execute("DROP TABLE keyword_matches")
+    cursor.execute("ALTER TABLE keyword_matches_slim RENAME TO keyword_matches")
+    cursor.execute("CREATE INDEX idx_keyword_matches_found ON keyword_matches (user_id, keyword, found_at DESC, post_id DESC)")
+
+
+def _analysis_keyword_counters(cursor):
+    """Per-(user, keyword) unread count and latest match time"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS keyword_counters (
+            user_id TEXT,
+            keyword TEXT,
+            unread_count INTEGER DEFAULT 0,
+            last_match_at INTEGER,
+            PRIMARY KEY (user_id, keyword)
+        )
+    ''')
+    print("[*] Counting existing keyword matches...")
+    cursor.execute('''
+        INSERT OR REPLACE INTO keyword_counters (user_id, keyword, unread_count, last_match_at)
+        SELECT user_id, keyword, SUM(is_read = 0), MAX(found_at)
+        FROM keyword_matches GROUP BY user_id, keyword
+    ''')
+
+
+def _analysis_board_stats_history_index(cursor):
+    """Index board stats history by board and time"""
+    # Previous-snapshot lookups and the scraper's write throttle both seek on these
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_board_stats_history_board ON board_stats_history (board_code, timestamp)")
+
+
+def _analysis_board_timeseries(cursor):
+    """Raw board activity samples with hourly/daily rollups"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_samples (
+            board_code TEXT,
+            ts INTEGER,
+            threads INTEGER,
+            replies INTEGER,
+            images INTEGER,
+            PRIMARY KEY (board_code, ts)
+        ) WITHOUT ROWID
+    ''')
+    # Running sums per bucket, so each sample is an O(1) upsert and no rollup job is needed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_rollups (
+            board_code TEXT,
+            resolution INTEGER, -- bucket width in seconds
+            bucket INTEGER,     -- bucket start (unix time)
+            samples INTEGER,
+            threads_sum INTEGER,
+            replies_sum INTEGER,
+            replies_max INTEGER,
+            threads_last INTEGER,
+            replies_last INTEGER,
+            images_last INTEGER,
+            last_ts INTEGER,
+            PRIMARY KEY (board_code, resolution, bucket)
+        ) WITHOUT ROWID
+    ''')
+
+    # Seed the rollups from the old snapshot history (left in place, no longer written)
+    from analysis_db import ROLLUP_UPSERT, RESOLUTIONS
+
+    def backfill(cursor, after, upto):
+        rows = cursor.execute('''
+            SELECT board_code, threads, replies, CAST(strftime('%s', timestamp) AS INTEGER)
+            FROM board_stats_history WHERE id > ? AND id <= ? AND timestamp IS NOT NULL
+        ''', (after, upto)).fetchall()
+        cursor.executemany(ROLLUP_UPSERT, [
+            (board, seconds, ts - ts % seconds, threads, replies, replies, threads, replies, None, ts)
+            for board, threads, replies, ts in rows
+            for seconds in RESOLUTIONS.values()
+        ])
+
+    _in_batches(cursor, "Rolling up board stats history", "board_stats_history", backfill)
+
+
+def _analysis_board_cache_checked(cursor):
+    """Separate board stats freshness from their data version"""
+    # A catalog 304 only marks the stats as checked (checked_at); updated_at and version
+    # move only when the stored stats change, so they can back HTTP validators.
+    existing = _columns(cursor, "board_stats_cache")
+    if "checked_at" not in existing:
+        cursor.execute("ALTER TABLE board_stats_cache ADD COLUMN checked_at DATETIME")
+    if "version" not in existing:
+        cursor.execute("ALTER TABLE board_stats_cache ADD COLUMN version INTEGER DEFAULT 1")
+    cursor.execute("UPDATE board_stats_cache SET checked_at = updated_at WHERE checked_at IS NULL")
+
+
+def _analysis_drop_board_stats_history_index(cursor):
+    """Drop the board stats history index"""
+    # Added in v6 for previous-snapshot lookups and the scraper's history write throttle;
+    # since v7 growth and history read board_samples/board_rollups and nothing writes or
+    # seeks board_stats_history, so the index only costs space.
+    cursor.execute("DROP INDEX IF EXISTS idx_board_stats_history_board")
+
+
+ANALYSIS_MIGRATIONS = [
+    _analysis_baseline,
+    _analysis_opportunities_fts,
+    _analysis_signatures,
+    _analysis_shared_post_matches,
+    _analysis_keyword_counters,
+    _analysis_board_stats_history_index,
+    _analysis_board_timeseries,
+    _analysis_board_cache_checked,
+    _analysis_drop_board_stats_history_index,
+]
+
+
+# --- Users (data/users.db) ---
+# The users, saved_items and collections tables are created by the web app
+# (web/src/lib/db_users.ts); Python-side indexes or columns go here.
+USERS_MIGRATIONS = []
@@ -1,40 +1,68 @@
 import threading
 import time
 import logging
-from typing import List, Optional
+from typing import Callable, List, Optional
 
-from board_scraper import get_all_boards, scrape_board
+from service_lock import ServiceLock
 
 
 class MonitorService:
-    """Simple threaded monitor that reuses existing scraper functions to keep the archive fresh."""
+    """
+    Simple threaded monitor that reuses existing scraper functions to keep the archive fresh.
+    Only one process can run it at a time (see ServiceLock).
+    """
 
-    def __init__(self, interval: int = 300, boards: Optional[List[str]] = None):
+    def __init__(self, interval: int = 300, boards: Optional[List[str]] = None,
+                 on_match: Optional[Callable[[str, dict], None]] = None):
         self.interval = interval
         self.boards = boards
+        self.on_match = on_match
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._logger = logging.getLogger("monitor_service")
+        self.lock = ServiceLock("monitor")
 
     def start(self):
+        """Starts the monitor thread. Returns False if another process holds the monitor lock."""
         if self._thread and self._thread.is_alive():
             self._logger.info("Monitor already running")
-            return
+            return True
+        if not self.lock.acquire():
+            self._logger.info(f"Monitor is active in another process ({self.lock.holder()}); not starting")
+            return False
         self._stop_event.clear()
         self._thread = threading.Thread(target=self._run, daemon=True, name="MonitorThread")
         self._thread.start()
         self._logger.info("Monitor started")
+        return True
 
     def stop(self):
         self._stop_event.set()
-        if self._thread:
+        if self._thread and self._thread.is_alive():
             self._thread.join(timeout=10)
+            if self._thread.is_alive():
+                # _run releases the lock on exit, so no other process can start a second monitor meanwhile
+                self._logger.warning("Monitor is still finishing its current board; it stops (and releases its lock) when done")
+                return
+        else:
+            self.lock.release()
         self._logger.info("Monitor stopped")
 
     def running(self) -> bool:
         return self._thread is not None and self._thread.is_alive()
 
     def _run(self):
+        try:
+            self._loop()
+        finally:
+            # Held for as long as this thread runs, even if stop() gave up waiting for it
+            self.lock.release()
+
+    def _loop(self):
+        # Imported here so importing the service (e.g. from app.py) does not load requests
+        from board_scraper import get_all_boards, scrape_board
+        from analysis_db import AnalysisDB
+        stats_db = AnalysisDB()  # board stats recorded from each catalog fetch
         while not self._stop_event.is_set():
             try:
                 boards = self.boards or get_all_boards()
@@ -45,7 +73,7 @@ class MonitorService:
                         break
                     try:
                         self._logger.info(f"Scraping board /{b}/")
-                        scrape_board(b)
+                        scrape_board(b, stats_db=stats_db)
                     except Exception as e:
                         self._logger.exception(f"Error scraping {b}: {e}")
 
@@ -53,7 +81,7 @@ class MonitorService:
                 try:
                     from tracking import run_sweep
                     self._logger.info("Running keyword sweep for all users...")
-                    run_sweep()
+                    run_sweep(on_match=self.on_match)
                 except Exception as e:
                     self._logger.exception(f"Error during automated keyword sweep: {e}")
 
@@ -0,0 +1,85 @@
+import re
+import argparse
+import sqlite3
+from pathlib import Path
+
+# Lexicons are matched against the raw archived HTML, so apostrophes may appear as &#039;
+APOS = r"(?:'|&#039;|&#39;)?"
+
+SIGNALS = {
+    "pain": (1.0, re.compile(
+        r"\b(?:hate|hated|annoying|annoyed|frustrat\w*|sick of|tired of|fed up|broken|sucks|"
+        r"worst|nightmare|useless|garbage|can" + APOS + r"t stand|gave up|waste of)\b", re.I)),
+    "money": (1.5, re.compile(
+        r"(?:\$\d+|\b(?:pay|paid|paying|price|prices|pricing|subscription|subscriptions|budget|afford|"
+        r"expensive|overpriced|refund|worth the money|would pay|shell out)\b)", re.I)),
+    "tool": (2.0, re.compile(
+        r"\b(?:is there (?:a|an|any) (?:tool|app|program|software|site|website|service|extension)|"
+        r"any (?:recommendations|alternatives)|alternative to|looking for (?:a|an) (?:tool|app|program|service)|"
+        r"wish there (?:was|were)|someone should (?:make|build)|how do (?:i|you) (?:automate|stop|fix|get))\b", re.I)),
+}
+
+# Tunable ranking weights: signal posts stand in for distinct voices (the archive keeps no
+# poster ids), density rewards threads where the signal is not buried in noise
+WEIGHTS = {"signal_posts": 1.0, "density": 10.0}
+
+
+def signal_score(comment):
+    """Weighted number of lexicon hits in a single post comment."""
+    if not comment:
+        return 0.0
+    score = 0.0
+    for weight, pattern in SIGNALS.values():
+        score += weight * len(pattern.findall(comment))
+    return score
+
+
+def rank_threads(conn, board, min_replies=30, pool_size=150, top_n=15, min_score=0.0):
+    """
+    Scores the `pool_size` most recently active threads of a board in a single SQL pass
+    and returns up to `top_n` (thread_id, score) pairs, best first. Threads with a
+    score at or below `min_score` are dropped so boards with no signal cost no LLM call.
+    """
+    conn.create_function("signal_score", 1, signal_score, deterministic=True)
+    rows = conn.execute('''
+        SELECT thread_id,
+               SUM(score) AS total,
+               SUM(score > 0) AS signal_posts,
+               COUNT(*) AS post_count
+        FROM (
+            SELECT p.thread_id, signal_score(p.comment) AS score
+            FROM posts p
+            WHERE p.board = ? AND p.thread_id IN (
+                SELECT thread_id FROM threads
+                WHERE board = ? AND reply_count >= ?
+                ORDER BY last_modified DESC
+                LIMIT ?
+            )
+        )
+        GROUP BY thread_id
+    ''', (board, board, min_replies, pool_size)).fetchall()
+
+    ranked = []
+    for thread_id, total, signal_posts, post_count in rows:
+        density = total / post_count if post_count else 0.0
+        score = WEIGHTS["signal_posts"] * signal_posts + WEIGHTS["density"] * density
+        if score > min_score:
+            ranked.append((thread_id, round(score, 3)))
+
+    ranked.sort(key=lambda r: r[1], reverse=True)
+    return ranked[:top_n] if top_n else ranked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank archived threads by local product-signal score.")
+    parser.add_argument("board", help="Board code to score (e.g., 'biz')")
+    parser.add_argument("--min-replies", type=int, default=30, help="Minimum replies per thread (default: 30)")
+    parser.add_argument("--pool-size", type=int, default=150, help="Recent threads to score (default: 150)")
+    parser.add_argument("--top", type=int, default=15, help="Threads to show (default: 15)")
+    args = parser.parse_args()
+
+    db_path = Path(__file__).resolve().parent.parent / "data" / "4chan_archive.db"
+    conn = sqlite3.connect(str(db_path), timeout=20)
+    for thread_id, score in rank_threads(conn, args.board, args.min_replies, args.pool_size, args.top):
+        print(f"{thread_id}\t{score}")
+    conn.close()
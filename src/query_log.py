@@ -0,0 +1,195 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque, OrderedDict
+
+# Opt-in: statements slower than this many milliseconds are recorded. Unset/0 = disabled.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+SLOW_QUERY_SUMMARY_INTERVAL = int(os.getenv("SLOW_QUERY_SUMMARY_INTERVAL", "300"))
+
+_entries = deque(maxlen=SLOW_QUERY_BUFFER)
+_lock = threading.Lock()
+_plans = OrderedDict()  # normalized sql -> plan lines, so each statement is explained once
+_MAX_PLANS = 256
+_logger = logging.getLogger("slow_queries")
+
+
+def enabled():
+    return SLOW_QUERY_MS > 0
+
+
+def normalize(sql):
+    """Collapses whitespace and inlined id lists so the same statement groups together."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return re.sub(r"IN \((?:\s*\d+\s*,)+\s*\d+\s*\)", "IN (...)", sql)
+
+
+def _params_shape(params):
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    return [type(v).__name__ for v in params]
+
+
+def _explain(conn, sql, params):
+    if not re.match(r"\s*(SELECT|WITH|UPDATE|DELETE)\b", sql, re.IGNORECASE):
+        return None
+    key = normalize(sql)
+    with _lock:
+        if key in _plans:
+            return _plans[key]
+    try:
+        # A plain cursor, so the instrumented cursor's pending result set is untouched
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+        plan = [row[-1] for row in rows]
+    except sqlite3.Error as e:
+        plan = [f"EXPLAIN failed: {e}"]
+    with _lock:
+        _plans[key] = plan
+        while len(_plans) > _MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+def _record(conn, sql, params, elapsed, rows=None):
+    entry = {
+        "at": time.time(),
+        "ms": round(elapsed * 1000, 2),
+        "db": os.path.basename(conn.db_path) if getattr(conn, "db_path", None) else None,
+        "sql": normalize(sql),
+        "params": _params_shape(params),
+        "plan": _explain(conn, sql, params)
+    }
+    if rows is not None:
+        entry["executemany_rows"] = rows
+    with _lock:
+        _entries.append(entry)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Times execute() plus the fetch calls that follow it: SQLite steps lazily, so most of
+    a SELECT's work happens during fetchall()/fetchone(), not execute(). (Iterating the
+    cursor directly is not timed.)
+    """
+
+    def execute(self, sql, params=()):
+        self._sql, self._params, self._logged = sql, params, False
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._elapsed = time.perf_counter() - started
+            self._check()
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._sql, self._params, self._logged = sql, seq_of_params[0] if seq_of_params else None, False
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._elapsed = time.perf_counter() - started
+            self._check(rows=len(seq_of_params))
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if getattr(self, "_sql", None) is not None:
+                self._elapsed += time.perf_counter() - started
+                self._check()
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed_fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def _check(self, rows=None):
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            try:
+                _record(self.connection, self._sql, self._params, self._elapsed, rows)
+            except Exception as e:
+                _logger.debug(f"Could not record slow query: {e}")
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def connect(path, **kwargs):
+    """sqlite3.connect, instrumented when SLOW_QUERY_MS is set."""
+    if not enabled():
+        return sqlite3.connect(path, **kwargs)
+    conn = sqlite3.connect(path, factory=TimedConnection, **kwargs)
+    conn.db_path = path
+    return conn
+
+
+def recent(limit=None):
+    """Recorded slow queries, newest first."""
+    with _lock:
+        entries = list(_entries)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def summary(since=None, top=10):
+    """Per-statement count / total / max ms for entries recorded after `since`."""
+    groups = {}
+    for entry in recent():
+        if since is not None and entry["at"] <= since:
+            continue
+        group = groups.setdefault(entry["sql"], {"sql": entry["sql"], "db": entry["db"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "plan": entry["plan"]})
+        group["count"] += 1
+        group["total_ms"] = round(group["total_ms"] + entry["ms"], 2)
+        group["max_ms"] = max(group["max_ms"], entry["ms"])
+    return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:top]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def start_summary_logger(interval=SLOW_QUERY_SUMMARY_INTERVAL):
+    """Logs the slowest statements of each interval from a daemon thread. No-op when disabled."""
+    if not enabled() or interval <= 0:
+        return None
+
+    def run():
+        since = time.time()
+        while True:
+            time.sleep(interval)
+            now = time.time()
+            groups = summary(since=since, top=5)
+            since = now
+            if not groups:
+                continue
+            _logger.warning(f"{sum(g['count'] for g in groups)} slow queries (>= {SLOW_QUERY_MS:g} ms) in the last {interval}s:")
+            for g in groups:
+                _logger.warning(f"  {g['count']}x total {g['total_ms']} ms, max {g['max_ms']} ms [{g['db']}] {g['sql'][:200]} | plan: {'; '.join(g['plan'] or [])}")
+
+    thread = threading.Thread(target=run, daemon=True, name="SlowQuerySummary")
+    thread.start()
+    return thread
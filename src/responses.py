@@ -0,0 +1,81 @@
+import json
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+
+def dumps(content):
+    """Serialises plain dicts/lists (as returned by the DB layer) to compact UTF-8 JSON bytes."""
+    if orjson:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for payloads that are already JSON-ready. Returning it directly from a
+    handler skips FastAPI's recursive jsonable_encoder pass, which dominates on large threads.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+
+def json_response(content, response: Response = None, status_code=200):
+    """FastJSONResponse carrying over headers (e.g. ETag) already set on the injected response."""
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def make_etag(*parts):
+    """Strong ETag from the data generation parts that determine a response body."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def cache_headers(etag, last_modified=None, private=False):
+    headers = {
+        "ETag": etag,
+        # Clients may keep the body but must revalidate it on every use
+        "Cache-Control": "private, no-cache" if private else "no-cache"
+    }
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag, last_modified=None):
+    """Evaluates If-None-Match (preferred) or If-Modified-Since against the current version."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [c.strip() for c in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional(request: Request, response: Response, etag, last_modified=None, private=False):
+    """
+    Returns a 304 response if the client's copy is current; otherwise attaches the
+    validators to `response` and returns None so the handler builds the body.
+    """
+    headers = cache_headers(etag, last_modified, private)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
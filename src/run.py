@@ -0,0 +1,80 @@
+import os
+import sys
+import signal
+import logging
+import argparse
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).parent.parent / ".env.local")
+
+ROLES = ("api", "monitor", "scheduler")
+
+
+def run_api(host, port, workers):
+    import uvicorn
+    # Background services are started by the worker roles, not by every API worker
+    os.environ.setdefault("EMBEDDED_WORKERS", "false")
+    uvicorn.run("app:app", host=host, port=port, workers=workers)
+
+
+def run_background(roles, standby_interval=30, metrics_port=0):
+    """
+    Runs the monitor and/or scheduler in this process until SIGTERM/SIGINT.
+    If another process already holds a service lock, waits as a hot standby and
+    takes over when that process exits.
+    """
+    logger = logging.getLogger("rootsearch_worker")
+    if metrics_port:
+        from metrics import start_http_server
+        start_http_server(metrics_port)
+    import query_log
+    query_log.start_summary_logger()
+    services = []
+    if "monitor" in roles:
+        from monitor_service import MonitorService
+        services.append(MonitorService(interval=int(os.getenv("MONITOR_INTERVAL", "300"))))
+    if "scheduler" in roles:
+        from scheduler_service import SchedulerService
+        services.append(SchedulerService())
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop_event.set())
+
+    started = set()
+    while not stop_event.is_set():
+        for service in services:
+            if service not in started and service.start():
+                started.add(service)
+                logger.info(f"{type(service).__name__} active in this process")
+        stop_event.wait(standby_interval)
+
+    logger.info("Stopping background services")
+    for service in started:
+        if hasattr(service, "shutdown"):
+            service.shutdown()
+        else:
+            service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RootSearch process entry point.")
+    parser.add_argument("roles", nargs="+", choices=ROLES, help="Roles to run: 'api', or any of 'monitor' 'scheduler'")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")), help="uvicorn worker processes for the api role")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", "0")), help="Serve Prometheus /metrics on this port for background roles (0 = off)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if "api" in args.roles:
+        if len(args.roles) > 1:
+            print("[!] Run the api role on its own; start background roles in a separate process.")
+            sys.exit(1)
+        run_api(args.host, args.port, args.workers)
+    else:
+        run_background(args.roles, metrics_port=args.metrics_port)
@@ -2,41 +2,53 @@ import logging
 import os
 from typing import List
 
-from apscheduler.schedulers.background import BackgroundScheduler
-
 from db_manager import ArchiveDB
-from ingestdata import ingest_data
-from analysis import analyze_data
+from service_lock import ServiceLock
 
 
 class SchedulerService:
-    """Scheduler that periodically runs the ingestion + analysis pipeline."""
+    """
+    Scheduler that periodically runs the ingestion + analysis pipeline.
+    Only one process can run the schedule, and only one analysis run can be active at a time.
+    """
 
     def __init__(self):
         self._logger = logging.getLogger("scheduler_service")
-        self._scheduler = BackgroundScheduler()
+        # Created in start(): apscheduler (and the analysis pipeline) are only imported by the process that runs the schedule
+        self._scheduler = None
         self._job = None
+        self.lock = ServiceLock("scheduler")
+        self._analysis_lock = ServiceLock("analysis")
+        # Opt-in: stream completions and persist discoveries as they arrive
+        self.stream = os.getenv("ANALYSIS_STREAMING", "false").lower() == "true"
+        # Rank threads locally first so only the ones with product signal reach the LLM
+        self.prescore = os.getenv("ANALYSIS_PRESCORE", "true").lower() == "true"
 
     def start(self):
+        """Starts the schedule. Returns False if another process holds the scheduler lock."""
+        if self.running():
+            return True
+        if not self.lock.acquire():
+            self._logger.info(f"Scheduler is active in another process ({self.lock.holder()}); not starting")
+            return False
+        if self._scheduler is None:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            self._scheduler = BackgroundScheduler()
         if not self._scheduler.running:
             # Schedule daily analysis job at 02:00
             self._job = self._scheduler.add_job(self._run_analysis_once, "cron", hour=2, minute=0)
-
-            # Schedule a daily job to compute and save board stats for frontend use
-            try:
-                from board_stats import get_all_boards_stats
-                # Run once every 24 hours at midnight
-                self._scheduler.add_job(get_all_boards_stats, "cron", hour=0, minute=0)
-                self._logger.info("Scheduled daily board stats generation (Midnight)")
-            except Exception:
-                self._logger.exception("Failed to schedule daily board stats generation")
-
+            # Board stats need no job: the scraper records them from every catalog it fetches
             self._scheduler.start()
             self._logger.info("Scheduler started: analysis daily at 02:00")
+        return True
+
+    def running(self) -> bool:
+        return self._scheduler is not None and self._scheduler.running
 
     def shutdown(self):
-        if self._scheduler.running:
+        if self.running():
             self._scheduler.shutdown(wait=False)
+        self.lock.release()
         self._logger.info("Scheduler stopped")
 
     def run_analysis_once(self):
@@ -44,9 +56,15 @@ class SchedulerService:
         self._run_analysis_once()
 
     def _run_analysis_once(self):
+        # Manual triggers from any API worker and the nightly job must never overlap
+        if not self._analysis_lock.acquire():
+            self._logger.info(f"Analysis already running ({self._analysis_lock.holder()}); skipping")
+            return
         try:
             from key_rotator import rotator
-            
+            from ingestdata import ingest_data
+            from analysis import analyze_data
+
             db = ArchiveDB()
             boards = db.get_all_stored_boards()
             if not boards:
@@ -57,15 +75,18 @@ class SchedulerService:
             for board in boards:
                 try:
                     self._logger.info("Analyzing board /%s/...", board)
-                    data = ingest_data([board])
+                    data = ingest_data([board], prescore=self.prescore)
                     if not data:
                         continue
                         
                     api_key = rotator.get_active_key() or os.getenv("OPENROUTER_API_KEY")
-                    analyze_data(data, api_key, source_boards=[board])
+                    analyze_data(data, api_key, source_boards=[board], stream=self.stream)
                 except Exception as e:
                     self._logger.error("Failed to analyze board /%s/: %s", board, e)
-                    
+
+            rotator.flush()
             self._logger.info("All boards processed in background analysis run.")
         except Exception as e:
             self._logger.exception("Analysis job failed: %s", e)
+        finally:
+            self._analysis_lock.release()
@@ -3,27 +3,28 @@ import json
 from db_manager import ArchiveDB
 from ingestdata import clean_text
 
-def keyword_search(keyword, limit=50):
+def keyword_search(keyword, limit=50, db=None):
     """
     Searches the archive for a specific keyword using FTS5.
     """
-    db = ArchiveDB()
+    if db is None:
+        db = ArchiveDB()
     print(f"[*] Searching for '{keyword}'...")
     
     # Use the existing FTS5 search from ArchiveDB
-    results = db.search(keyword, limit=limit)
+    results, _, _ = db.search(keyword, limit=limit)
     
     if not results:
         print(f"[*] No results found for '{keyword}'.")
         return []
 
     processed_results = []
-    for board, thread_id, post_id, comment in results:
+    for r in results:
         processed_results.append({
-            "board": board,
-            "thread_id": thread_id,
-            "post_id": post_id,
-            "comment": clean_text(comment) # Clean HTML for readability
+            "board": r["board"],
+            "thread_id": r["thread_id"],
+            "post_id": r["post_id"],
+            "comment": clean_text(r["comment"]) # Clean HTML for readability
         })
     
     return processed_results
@@ -0,0 +1,77 @@
+import os
+import socket
+import logging
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+    import msvcrt
+
+
+class ServiceLock:
+    """
+    Exclusive, non-blocking lock on data/locks/<name>.lock that guarantees a single active
+    instance of a background service across processes sharing the data directory.
+
+    The OS drops the lock when the holding process exits, so a crashed scraper never
+    leaves a stale lease behind.
+    """
+
+    def __init__(self, name, lock_dir="data/locks"):
+        project_root = Path(__file__).parent.parent
+        self.name = name
+        self.path = project_root / lock_dir / f"{name}.lock"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = None
+        self._logger = logging.getLogger("service_lock")
+
+    @property
+    def held(self):
+        return self._fh is not None
+
+    def acquire(self):
+        """Returns True if this process now holds the lock (or already did)."""
+        if self._fh:
+            return True
+        fh = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            fh.close()
+            return False
+
+        # Record the holder for /health and debugging
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{socket.gethostname()}:{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        self._logger.info(f"Acquired '{self.name}' lock ({self.path})")
+        return True
+
+    def release(self):
+        if not self._fh:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+        self._logger.info(f"Released '{self.name}' lock")
+
+    def holder(self):
+        """host:pid of the last process that acquired the lock, if any."""
+        try:
+            return self.path.read_text().strip() or None
+        except OSError:
+            return None
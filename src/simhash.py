@@ -0,0 +1,53 @@
+import re
+import hashlib
+
+SIG_BITS = 64
+BANDS = 4
+BAND_BITS = SIG_BITS // BANDS
+MASK = (1 << SIG_BITS) - 1
+
+# With 4 bands of 16 bits, any two signatures within 3 bits share at least one band
+# exactly (pigeonhole), so the banded lookup never misses a match at this distance
+MAX_DISTANCE = 3
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'to', 'and', 'or', 'is', 'are', 'in', 'it', 'of', 'for', 'on', 'with', 'this',
+    'that', 'be', 'at', 'as', 'by', 'from', 'their', 'they', 'them', 'who', 'want', 'users', 'people'
+}
+
+# Fields that describe *what* was discovered; solution wording varies too much night to night
+SIGNATURE_FIELDS = ("category", "core_pain", "emerging_trend", "product_concept", "target_audience")
+
+
+def opportunity_text(opp):
+    return " ".join(str(opp.get(f) or "") for f in SIGNATURE_FIELDS)
+
+
+def _features(text):
+    words = [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOP_WORDS and len(w) > 1]
+    # Unigrams plus bigrams keep some word order without making signatures brittle
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def simhash(text):
+    """64-bit SimHash of text, returned as a signed integer so it fits a SQLite INTEGER."""
+    weights = [0] * SIG_BITS
+    for feature in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for bit in range(SIG_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    value = 0
+    for bit in range(SIG_BITS):
+        if weights[bit] > 0:
+            value |= 1 << bit
+    return value - (1 << SIG_BITS) if value >= 1 << (SIG_BITS - 1) else value
+
+
+def hamming(a, b):
+    return bin((a ^ b) & MASK).count("1")
+
+
+def bands(sig):
+    """Splits a signature into (band_index, band_value) lookup keys."""
+    unsigned = sig & MASK
+    return [(i, (unsigned >> (i * BAND_BITS)) & ((1 << BAND_BITS) - 1)) for i in range(BANDS)]
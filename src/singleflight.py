@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+from metrics import REGISTRY
+
+FLIGHT_CALLS = REGISTRY.counter("rootsearch_singleflight_calls_total", "Single-flight calls by outcome: started a task, coalesced onto one in flight, or failed.", ("name", "outcome"))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls for the same key onto one in-flight task, so N
+    simultaneous cache misses cost a single upstream fetch or query.
+
+    Callers wait through asyncio.shield: a caller timing out or disconnecting never
+    cancels the shared task, which finishes (and fills the cache) for everyone else.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+        self._logger = logging.getLogger("singleflight")
+
+        # Metrics
+        self.started = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def _done(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            FLIGHT_CALLS.inc(name=self.name, outcome="failed")
+            self._logger.warning(f"[{self.name}] {key!r} failed: {task.exception()}")
+
+    def start(self, key, factory):
+        """Returns the in-flight task for key, starting factory() if there is none."""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+            FLIGHT_CALLS.inc(name=self.name, outcome="coalesced")
+            return task
+        task = asyncio.ensure_future(factory())
+        self._tasks[key] = task
+        self.started += 1
+        FLIGHT_CALLS.inc(name=self.name, outcome="started")
+        task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    async def do(self, key, factory, timeout=None):
+        """Awaits the shared result; raises asyncio.TimeoutError after `timeout` seconds."""
+        task = self.start(key, factory)
+        if timeout is None:
+            return await asyncio.shield(task)
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def in_flight(self, key):
+        return key in self._tasks
+
+    def stats(self):
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "failed": self.failed
+        }
@@ -0,0 +1,56 @@
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+
+class StreamTickets:
+    """
+    Short-lived, single-use tickets for endpoints opened with EventSource, which cannot
+    send an Authorization header and so has to carry credentials in the URL. A ticket only
+    names the user and expires after `ttl` seconds, so one that ends up in an access log
+    is useless long before anyone reads it, unlike the session JWT it replaces.
+
+    Tickets are HMAC-signed with a key derived from the session secret, so any API worker
+    can verify them. Single use is enforced per process (redeemed nonces are remembered
+    until they expire); across workers the ttl bounds replay.
+    """
+
+    def __init__(self, secret, purpose, ttl=60):
+        self.ttl = ttl
+        self._key = hmac.new(secret.encode(), purpose.encode(), hashlib.sha256).digest()
+        self._redeemed = OrderedDict()  # nonce -> expires_at, in redemption order
+        self._lock = threading.Lock()
+
+    def _sign(self, body):
+        return base64.urlsafe_b64encode(hmac.new(self._key, body.encode(), hashlib.sha256).digest()[:18]).decode()
+
+    def issue(self, user_id):
+        """Returns (ticket, expires_in)."""
+        user = base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
+        body = f"{user}.{int(time.time()) + self.ttl}.{secrets.token_urlsafe(12)}"
+        return f"{body}.{self._sign(body)}", self.ttl
+
+    def redeem(self, ticket):
+        """Returns the ticket's user id, or None if it is malformed, forged, expired or already used."""
+        try:
+            user, expires_at, nonce, signature = ticket.split(".")
+            expires_at = int(expires_at)
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature.encode(), self._sign(f"{user}.{expires_at}.{nonce}").encode()):
+            return None
+        now = time.time()
+        if expires_at <= now:
+            return None
+        with self._lock:
+            if nonce in self._redeemed:
+                return None
+            # Every ticket lives `ttl` seconds, so the oldest redemptions expire first
+            while self._redeemed and next(iter(self._redeemed.values())) <= now:
+                self._redeemed.popitem(last=False)
+            self._redeemed[nonce] = expires_at
+        return base64.urlsafe_b64decode(user + "=" * (-len(user) % 4)).decode()
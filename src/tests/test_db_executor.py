@@ -0,0 +1,76 @@
+import sys
+import asyncio
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_executor import DBExecutor, DBBusyError
+
+
+class PendingAccountingTest(unittest.TestCase):
+    def test_cancelled_waiter_keeps_slot_until_work_finishes(self):
+        executor = DBExecutor("test", object, max_workers=1, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+
+        def blocking(db):
+            started.set()
+            release.wait(5)
+            return "done"
+
+        async def scenario():
+            waiter = asyncio.ensure_future(executor.run(blocking))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+
+            # The query is still running on the pool, so its slot is still taken
+            self.assertEqual(executor.pending, 1)
+            with self.assertRaises(DBBusyError):
+                await executor.run(blocking)
+
+            release.set()
+            for _ in range(100):
+                if executor.pending == 0:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(executor.pending, 0)
+            self.assertEqual(await executor.run(lambda db: "next"), "next")
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_cancelled_before_start_releases_slot(self):
+        executor = DBExecutor("test", object, max_workers=1, max_pending=2)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(executor.run(lambda db: release.wait(5)))
+            queued = asyncio.ensure_future(executor.run(lambda db: "never"))
+            await asyncio.sleep(0.05)
+            self.assertEqual(executor.pending, 2)
+
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            await asyncio.sleep(0)
+            self.assertEqual(executor.pending, 1)
+
+            release.set()
+            await running
+            self.assertEqual(executor.pending, 0)
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            release.set()
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
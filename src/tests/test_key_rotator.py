@@ -0,0 +1,38 @@
+import sys
+import time
+import unittest
+from email.utils import formatdate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from key_rotator import MAX_COOLDOWN, _parse_retry_after
+except ImportError:  # python-dotenv not installed
+    _parse_retry_after = None
+
+
+@unittest.skipUnless(_parse_retry_after, "python-dotenv is required")
+class RetryAfterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = time.time()
+
+    def test_delta_seconds(self):
+        self.assertEqual(_parse_retry_after("30", self.now), 30)
+
+    def test_negative_and_garbage_fall_back(self):
+        for value in ("-5", "nan", "inf", "soon", "", None):
+            self.assertIsNone(_parse_retry_after(value, self.now), value)
+
+    def test_http_date(self):
+        seconds = _parse_retry_after(formatdate(self.now + 120, usegmt=True), self.now)
+        self.assertAlmostEqual(seconds, 120, delta=1)
+        self.assertEqual(_parse_retry_after(formatdate(self.now - 100, usegmt=True), self.now), 0)
+
+    def test_capped(self):
+        self.assertEqual(_parse_retry_after("1000000", self.now), MAX_COOLDOWN)
+        self.assertEqual(_parse_retry_after(formatdate(self.now + 10 ** 8, usegmt=True), self.now), MAX_COOLDOWN)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from fastapi.testclient import TestClient
+    import app as api
+except ImportError:  # API dependencies not installed
+    api = None
+
+from db_manager import ArchiveDB
+
+
+@unittest.skipUnless(api, "fastapi and the API's dependencies are required")
+class InvalidSearchQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = str(Path(self.tmp.name) / "archive.db")
+        ArchiveDB(path).insert_thread("g", {"posts": [{"no": 1, "time": 1700000000, "com": "foo bar"}]})
+        self.executor = api.DBExecutor("archive-test", lambda: ArchiveDB(path), max_workers=1)
+        self.original, api.archive_executor = api.archive_executor, self.executor
+        self.client = TestClient(api.app)
+
+    def tearDown(self):
+        api.archive_executor = self.original
+        self.executor.shutdown()
+        self.tmp.cleanup()
+
+    def test_search_rejects_malformed_fts_query(self):
+        response = self.client.get("/search", params={"q": '"foo'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid search query", response.json()["detail"])
+
+    def test_search_still_matches(self):
+        response = self.client.get("/search", params={"q": "foo"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["post_id"] for r in response.json()], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import sys
+import statistics
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.startup import DEFAULT_BUDGET_MS, measure_import
+
+RUNS = 3
+
+
+class StartupBudgetTest(unittest.TestCase):
+    def test_app_import_within_budget(self):
+        """Importing the API in a fresh interpreter stays under STARTUP_BUDGET_MS (median of RUNS)."""
+        timings = []
+        for _ in range(RUNS):
+            try:
+                elapsed, _ = measure_import("app")
+            except RuntimeError as e:
+                if "ModuleNotFoundError" in str(e):
+                    self.skipTest(f"API dependencies not installed ({e})")
+                raise
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        self.assertLessEqual(median, DEFAULT_BUDGET_MS,
+                             f"import app took {median:.0f} ms (budget {DEFAULT_BUDGET_MS:.0f} ms); "
+                             f"run `python -m benchmarks.startup` for the slowest imports")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from metrics import CACHE_EVENTS
+
+
+class ThreadCache:
+    """
+    Bounded LRU of recently opened threads: (board, thread_id) -> thread info plus posts.
+    Archived posts are append-only (the scraper inserts with INSERT OR IGNORE and never
+    rewrites comments), so when a thread's version (see ArchiveDB.get_thread_version) moves on,
+    only the posts after the cached tail need fetching; see extend().
+    Bounded by thread count and by the total number of cached posts.
+    """
+
+    def __init__(self, max_threads=256, max_posts=50000, name="threads"):
+        self.name = name
+        self.max_threads = max_threads
+        self.max_posts = max_posts
+        self._entries = OrderedDict()  # key -> entry dict
+        self._posts = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.extended = 0
+        self.evicted = 0
+
+    def get(self, key, version):
+        """
+        Returns (entry, fresh). fresh is False when the entry is missing (entry None) or
+        older than `version`, in which case the caller fetches and calls store()/extend().
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_EVENTS.inc(cache=self.name, event="miss")
+                return None, False
+            self._entries.move_to_end(key)
+            if entry["version"] != version:
+                return entry, False
+            self.hits += 1
+            CACHE_EVENTS.inc(cache=self.name, event="hit")
+            return entry, True
+
+    def store(self, key, thread, version):
+        """Caches a thread as returned by ArchiveDB.get_thread. Returns the entry."""
+        posts = thread["posts"]
+        entry = {
+            "info": {k: v for k, v in thread.items() if k != "posts"},
+            "posts": posts,
+            "ids": [p["no"] for p in posts],
+            "version": version
+        }
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._posts -= len(old["posts"])
+            self._insert_locked(key, entry)
+        return entry
+
+    def extend(self, key, entry, thread, version):
+        """
+        Appends the posts of `thread` (fetched with after_post_id = the cached tail) to
+        `entry` and refreshes its info. Posts at or below the tail are skipped, so
+        overlapping extends from concurrent requests are harmless.
+        """
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._posts -= len(old["posts"])
+            tail = entry["ids"][-1] if entry["ids"] else 0
+            new = [p for p in thread["posts"] if p["no"] > tail]
+            entry["posts"].extend(new)
+            entry["ids"].extend(p["no"] for p in new)
+            entry["info"] = {k: v for k, v in thread.items() if k != "posts"}
+            entry["version"] = version
+            self.extended += 1
+            CACHE_EVENTS.inc(cache=self.name, event="extended")
+            self._insert_locked(key, entry)
+        return entry
+
+    def _insert_locked(self, key, entry):
+        self._entries[key] = entry
+        self._posts += len(entry["posts"])
+        while self._entries and (len(self._entries) > self.max_threads or self._posts > self.max_posts):
+            _, dropped = self._entries.popitem(last=False)
+            self._posts -= len(dropped["posts"])
+            self.evicted += 1
+            CACHE_EVENTS.inc(cache=self.name, event="evicted")
+
+    @staticmethod
+    def page(entry, after_post_id=None, limit=None):
+        """Thread info plus posts after `after_post_id` (up to `limit`), and the cursor for the next page."""
+        ids = entry["ids"]
+        start = bisect.bisect_right(ids, after_post_id) if after_post_id else 0
+        end = min(len(ids), start + limit) if limit else len(ids)
+        return {
+            **entry["info"],
+            "posts": entry["posts"][start:end],
+            "next_after_post_id": ids[end - 1] if end < len(ids) else None
+        }
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.extended
+            return {
+                "threads": len(self._entries),
+                "posts": self._posts,
+                "max_threads": self.max_threads,
+                "max_posts": self.max_posts,
+                "hits": self.hits,
+                "misses": self.misses,
+                "extended": self.extended,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evicted": self.evicted
+            }
@@ -0,0 +1,107 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import CACHE_EVENTS
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWTs: sha256(token) -> decoded payload, kept until the
+    token's own `exp` (capped at max_ttl). Only successfully verified tokens are stored,
+    so a hit is exactly as trustworthy as re-running the HMAC check.
+
+    At capacity an insert evicts the LRU head in O(1). Expired entries are swept once
+    every `purge_every` inserts (default max_size), which keeps the sweep amortised O(1).
+    """
+
+    def __init__(self, max_size=10000, max_ttl=3600, purge_every=None, name="jwt"):
+        self.name = name
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.purge_every = purge_every or max_size
+        self._entries = OrderedDict()  # digest -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self._puts_since_purge = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """Returns a copy of the cached payload, or None on a miss or an expired entry."""
+        key = self._digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_EVENTS.inc(cache=self.name, event="miss")
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                CACHE_EVENTS.inc(cache=self.name, event="expired")
+                CACHE_EVENTS.inc(cache=self.name, event="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_EVENTS.inc(cache=self.name, event="hit")
+            return dict(payload)
+
+    def put(self, token, payload):
+        now = time.time()
+        expires_at = now + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now:
+            return
+
+        key = self._digest(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            self._puts_since_purge += 1
+            if self._puts_since_purge >= self.purge_every:
+                self._purge_locked(now)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+                CACHE_EVENTS.inc(cache=self.name, event="evicted")
+
+    def _purge_locked(self, now):
+        stale = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for k in stale:
+            del self._entries[k]
+        self.expired += len(stale)
+        if stale:
+            CACHE_EVENTS.inc(len(stale), cache=self.name, event="expired")
+        self._puts_since_purge = 0
+        return len(stale)
+
+    def purge_expired(self):
+        with self._lock:
+            return self._purge_locked(time.time())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
@@ -4,13 +4,15 @@ from db_manager import ArchiveDB
 from analysis_db import AnalysisDB
 from ingestdata import clean_text
 
-def run_sweep():
+def run_sweep(on_match=None, adb=None, archive_db=None):
     """
     Searches the archive for all tracked keywords across all users and saves new matches.
     Matches are only found for posts appearing AFTER the keyword was added by the user.
+    on_match(user_id, match) is called for every newly saved match (e.g. to push it to
+    connected clients).
     """
-    adb = AnalysisDB()
-    archive_db = ArchiveDB()
+    adb = adb or AnalysisDB()
+    archive_db = archive_db or ArchiveDB()
     
     # Returns [(user_id, keyword, added_at), ...]
     tracked_items = adb.get_tracked_keywords()
@@ -24,13 +26,13 @@ def run_sweep():
         # added_at is a string from SQLite: 'YYYY-MM-DD HH:MM:SS'
         # archive_db.search expects a timestamp string or something it can compare directly in SQL
         
-        results, total = archive_db.search(kw, limit=100, min_timestamp=added_at) 
+        results, total, _ = archive_db.search(kw, limit=100, min_timestamp=added_at)
         
         if results:
             print(f"  [+] User {user_id}: Found {len(results)} matches for '{kw}' since {added_at}")
             for r in results:
                 # r is a dict from ArchiveDB.search: {"board", "thread_id", "post_id", "comment", ...}
-                adb.save_keyword_match(
+                match = adb.save_keyword_match(
                     user_id=user_id,
                     keyword=kw,
                     board=r['board'],
@@ -38,6 +40,8 @@ def run_sweep():
                     post_id=r['post_id'],
                     comment=clean_text(r['comment'])
                 )
+                if match and on_match:
+                    on_match(user_id, match)
         
     print(f"[*] Sweep complete. Checking database for new matches...")
     # Summary of total matches found ever
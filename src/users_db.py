@@ -1,15 +1,20 @@
 import sqlite3
 from pathlib import Path
 import time
+from metrics import timed_query
+import query_log
+import migrations
 
 class UserDB:
     def __init__(self, db_path="data/users.db"):
         # Ensure db_path is relative to project root
         project_root = Path(__file__).parent.parent
         self.db_path = project_root / db_path
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn = query_log.connect(str(self.db_path), check_same_thread=False)
         self.conn.execute("PRAGMA journal_mode=WAL")
+        migrations.migrate(self.conn, "users", migrations.USERS_MIGRATIONS)
 
+    @timed_query("users")
     def update_plan(self, user_id, plan_type):
         """Updates the user's plan type."""
         cursor = self.conn.cursor()
@@ -21,6 +26,7 @@ class UserDB:
         self.conn.commit()
         return cursor.rowcount > 0
 
+    @timed_query("users")
     def get_user(self, user_id):
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))